@@ -1,4 +1,15 @@
 #!/bin/bash
+# Usage: ./compile.sh [onefile|standalone]
+#   onefile (default): a single cli.exe that unpacks itself once into the user
+#     cache dir and reuses that on later runs instead of unpacking every time.
+#   standalone: a cli.dist folder with the executable, nothing to unpack.
 . ./activate.sh
 pip install nuitka==2.0.3
-python -m nuitka --standalone --follow-imports --onefile --mingw --lto=yes --python-flag=-OO src/youtube_html_parser/cli.py
\ No newline at end of file
+MODE=${1:-onefile}
+VERSION=$(grep -m1 '^version' pyproject.toml | cut -d'"' -f2)
+ARGS="--standalone --follow-imports --mingw --lto=yes --python-flag=-OO"
+if [ "$MODE" = "standalone" ]; then
+    python -m nuitka $ARGS src/youtube_html_parser/cli.py
+else
+    python -m nuitka $ARGS --onefile --onefile-tempdir-spec="{CACHE_DIR}/youtube-html-parser/$VERSION" src/youtube_html_parser/cli.py
+fi
@@ -0,0 +1,356 @@
+"""
+asyncio front end of the parse service, with a bounded queue and load shedding.
+"""
+
+import asyncio
+import os
+import signal
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+from youtube_html_parser.batch import parse_chunk
+from youtube_html_parser.cache import ParseCache, html_digest
+from youtube_html_parser.metrics import REGISTRY
+from youtube_html_parser.web import (
+    METRICS_CONTENT_TYPE,
+    METRICS_PATH,
+    PROFILE_HEADER,
+    BadRequest,
+    add_cache_arguments,
+    cache_from_args,
+    configure_pool,
+    html_from_body,
+    page_of,
+    replace_broken_pool,
+    shutdown_pool,
+)
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# A client gets this long to send its headers and body.
+READ_TIMEOUT = 30.0
+# How much of an unread body is dropped before the connection is closed, so
+# the close does not reset it before the client read the response.
+MAX_DISCARD_BYTES = 8 * 1024 * 1024
+DISCARD_TIMEOUT = 2.0
+
+
+class AsyncParseServer:  # pylint: disable=too-many-instance-attributes
+    """Serves POSTed pages, parsing at most max_concurrent at a time.
+
+    Up to max_queue more requests wait for a slot, anything beyond that is
+    answered right away with 503 and a Retry-After header, before its body is
+    read. Every response closes the connection, after dropping up to
+    MAX_DISCARD_BYTES of a body that was not read. With replace_pool, a pool
+    that lost a worker is swapped for the one it returns and the parse is
+    retried once.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        pool: ProcessPoolExecutor,
+        max_concurrent: int,
+        max_queue: int = 0,
+        retry_after: int = 1,
+        cache: ParseCache | None = None,
+        replace_pool: (
+            Callable[[ProcessPoolExecutor], ProcessPoolExecutor] | None
+        ) = None,
+    ) -> None:
+        self.pool = pool
+        self.replace_pool = replace_pool
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.cache = cache
+        self.server: asyncio.Server | None = None
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.admitted = 0
+        self._handlers: set[asyncio.Task[Any]] = set()
+        self.counts = {"served": 0, "rejected": 0, "failed": 0}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> int:
+        """Start listening, returns the port (useful with port 0)."""
+        self.server = await asyncio.start_server(self._on_connection, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    @property
+    def connections(self) -> int:
+        """Connections being served, admitted or not."""
+        return len(self._handlers)
+
+    async def drain(self, timeout: float = 30.0) -> None:
+        """Stop accepting connections and let the admitted requests finish.
+
+        Connections still open after timeout seconds are dropped.
+        """
+        if self.server is None:
+            return
+        self.server.close()
+        if self._handlers:
+            _, pending = await asyncio.wait(self._handlers, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+        # Since Python 3.12 this also waits for every open connection.
+        await self.server.wait_closed()
+
+    async def _on_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        self._handlers.add(task)
+        try:
+            await self._handle(reader, writer)
+        except (
+            ConnectionError,
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            asyncio.TimeoutError,
+        ):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        method, path, headers = await asyncio.wait_for(_read_head(reader), READ_TIMEOUT)
+        if method == "GET" and urlsplit(path).path == METRICS_PATH:
+            body = REGISTRY.render_prometheus().encode("utf-8")
+            await _respond(
+                writer, HTTPStatus.OK, body, {"Content-Type": METRICS_CONTENT_TYPE}
+            )
+            return
+        if method != "POST":
+            await _respond(writer, HTTPStatus.METHOD_NOT_ALLOWED, b"POST only")
+            await _discard_body(reader, writer, headers)
+            return
+        if self.admitted >= self.max_concurrent + self.max_queue:
+            self.counts["rejected"] += 1
+            await _respond(
+                writer,
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                b"Server busy, retry later.",
+                {"Retry-After": str(self.retry_after)},
+            )
+            await _discard_body(reader, writer, headers)
+            return
+        self.admitted += 1
+        try:
+            status, body, content_type = await self._serve(reader, headers)
+        finally:
+            self.admitted -= 1
+        await _respond(writer, status, body, {"Content-Type": content_type})
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, headers: dict[str, str]
+    ) -> tuple[HTTPStatus, bytes, str]:
+        try:
+            length = int(headers["content-length"])
+        except (KeyError, ValueError):
+            return HTTPStatus.LENGTH_REQUIRED, b"Length Required", "text/plain"
+        if not 0 <= length <= MAX_BODY_BYTES:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, b"Too large", "text/plain"
+        body = await asyncio.wait_for(reader.readexactly(length), READ_TIMEOUT)
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        try:
+            html = html_from_body(
+                body, content_type, headers.get("content-encoding", "identity")
+            )
+        except BadRequest as e:
+            return HTTPStatus(e.status), str(e).encode("utf-8"), "text/plain"
+        profile = headers.get(PROFILE_HEADER.lower(), "").strip() == "1"
+        async with self._slots:
+            try:
+                json_str = await self._parse(html, profile)
+            except Exception as e:  # pylint: disable=broad-except
+                self.counts["failed"] += 1
+                message = f"Error processing the HTML: {e}".encode("utf-8")
+                return HTTPStatus.INTERNAL_SERVER_ERROR, message, "text/plain"
+        self.counts["served"] += 1
+        return HTTPStatus.OK, json_str.encode("utf-8"), "application/json"
+
+    async def _parse(self, html: str | bytes, profile: bool = False) -> str:
+        loop = asyncio.get_running_loop()
+        key = None
+        # A profiled parse skips the cache, like in the threaded server.
+        if self.cache is not None and not profile:
+            key = html_digest(html, "page")
+            # The disk tier of the cache blocks, keep it off the loop.
+            cached = await loop.run_in_executor(None, self.cache.get, key)
+            if cached is not None:
+                return cached.serialize()
+        pool = self.pool
+        try:
+            future = pool.submit(parse_chunk, [(0, html)], False, profile)
+            results = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            if self.replace_pool is None:
+                raise
+            self.pool = self.replace_pool(pool)
+            future = self.pool.submit(parse_chunk, [(0, html)], False, profile)
+            results = await asyncio.wrap_future(future)
+        page = page_of(results)
+        if self.cache is not None and key is not None:
+            await loop.run_in_executor(None, self.cache.put, key, page)
+        return page.serialize()
+
+
+async def _read_head(
+    reader: asyncio.StreamReader,
+) -> tuple[str, str, dict[str, str]]:
+    request_line = await reader.readuntil(b"\r\n")
+    method, path = (request_line.decode("latin-1").split(" ") + ["", ""])[:2]
+    headers: dict[str, str] = {}
+    size = len(request_line)
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        size += len(line)
+        if size > MAX_HEADER_BYTES:
+            raise ConnectionError("Headers too large.")
+        if line == b"\r\n":
+            return method, path, headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def _respond(
+    writer: asyncio.StreamWriter,
+    status: HTTPStatus,
+    body: bytes,
+    headers: dict[str, str] | None = None,
+) -> None:
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    for name, value in (headers or {}).items():
+        lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {len(body)}")
+    lines.append("Connection: close")
+    head = "\r\n".join(lines) + "\r\n\r\n"
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+async def _discard_body(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: dict[str, str]
+) -> None:
+    """Drop the body of a request that was answered without reading it.
+
+    The write side is shut down first so the client sees the end of the
+    response, then at most MAX_DISCARD_BYTES are read within DISCARD_TIMEOUT.
+    """
+    try:
+        length = min(int(headers.get("content-length", "0")), MAX_DISCARD_BYTES)
+    except ValueError:
+        length = 0
+    if writer.can_write_eof():
+        writer.write_eof()
+    await asyncio.wait_for(_read_and_drop(reader, length), DISCARD_TIMEOUT)
+
+
+async def _read_and_drop(reader: asyncio.StreamReader, length: int) -> None:
+    while length > 0:
+        chunk = await reader.read(min(length, 65536))
+        if not chunk:
+            return
+        length -= len(chunk)
+
+
+async def serve(server: AsyncParseServer, port: int, drain_timeout: float) -> None:
+    """Serve until SIGINT or SIGTERM, then drain the admitted requests."""
+    port = await server.start(port=port)
+    print(f"Starting asyncio httpd on port {port}...")
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    print("Draining...")
+    await server.drain(drain_timeout)
+
+
+def run_async(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    port: int = 8000,
+    jobs: int | None = None,
+    max_tasks_per_child: int | None = None,
+    max_queue: int = 0,
+    retry_after: int = 1,
+    drain_timeout: float = 30.0,
+    cache: ParseCache | None = None,
+) -> None:
+    """Run the asyncio server on the pool of the web module, one parse per worker.
+
+    Results are only cached with a cache.
+    """
+    # Started before the socket is bound, see create_pool.
+    pool = configure_pool(jobs, max_tasks_per_child)
+    server = AsyncParseServer(
+        pool,
+        jobs or os.cpu_count() or 1,
+        max_queue,
+        retry_after,
+        cache,
+        replace_broken_pool,
+    )
+    try:
+        asyncio.run(serve(server, port, drain_timeout))
+    finally:
+        shutdown_pool()
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        description="Parse YouTube pages POSTed over HTTP, shedding load when busy."
+    )
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--jobs", type=int, help="Worker processes (default all cores)."
+    )
+    parser.add_argument(
+        "--max-tasks-per-child",
+        type=int,
+        help="Replace a worker after it parsed this many pages.",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=0,
+        help="Requests that may wait for a worker before getting a 503.",
+    )
+    parser.add_argument(
+        "--retry-after", type=int, default=1, help="Retry-After seconds of a 503."
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=30.0,
+        help="Seconds to let admitted requests finish on shutdown.",
+    )
+    parser.add_argument(
+        "--no-metrics",
+        action="store_true",
+        help=f"Do not record the parse stage timings served on {METRICS_PATH}.",
+    )
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    REGISTRY.enable(not args.no_metrics)
+    run_async(
+        port=args.port,
+        jobs=args.jobs,
+        max_tasks_per_child=args.max_tasks_per_child,
+        max_queue=args.max_queue,
+        retry_after=args.retry_after,
+        drain_timeout=args.drain_timeout,
+        cache=cache_from_args(args),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Reading of pages straight out of tar and zip crawl archives.
+"""
+
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import IO, Iterator
+
+from youtube_html_parser.batch import ArchiveMember, is_html_file
+
+
+def iter_archive(archive: Path) -> Iterator[ArchiveMember]:
+    """Yield the html members of a tar (optionally compressed) or zip archive.
+
+    Members are read one at a time in archive order, nothing is extracted to
+    disk. Compressed members such as .html.gz are decompressed when parsed.
+    """
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not is_html_file(Path(info.filename)):
+                    continue
+                yield ArchiveMember(name=info.filename, data=zf.read(info))
+        return
+    with open(archive, "rb") as f:
+        yield from iter_tar_stream(f)
+
+
+def iter_tar_stream(fileobj: IO[bytes]) -> Iterator[ArchiveMember]:
+    """Yield the html members of a tar read sequentially from a file object."""
+    # "r|*" reads the tar as a stream, any of the stdlib compressions.
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile() or not is_html_file(Path(member.name)):
+                continue
+            f = tf.extractfile(member)
+            assert f is not None, f"Could not read {member.name}"
+            yield ArchiveMember(name=member.name, data=f.read())
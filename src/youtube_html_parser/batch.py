@@ -0,0 +1,419 @@
+"""
+Parallel parsing of many pages with a pool of worker processes.
+"""
+
+import glob
+import multiprocessing
+import os
+import signal
+import warnings
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any, Callable, Iterable, Iterator, Union
+
+from youtube_html_parser.htmlfile import decompress_bytes, open_html_bytes
+from youtube_html_parser.metrics import REGISTRY
+from youtube_html_parser.parser import (
+    create_soup,
+    parse_yt_page,
+    parse_yt_page_bytes,
+    parse_yt_page_seach,
+    parse_yt_page_seach_bytes,
+)
+from youtube_html_parser.profiling import PROFILER, ProfileConfig
+from youtube_html_parser.serialize import NdjsonWriter
+from youtube_html_parser.ytpage import YtPage
+from youtube_html_parser.ytpagesearch import YtPageSearch
+
+
+@dataclass
+class ArchiveMember:
+    """A page read out of an archive, results are tagged with its name."""
+
+    name: str
+    data: bytes
+
+
+# A Path (or os.PathLike) is read from disk, str and bytes are the html itself.
+BatchItem = Union[str, bytes, os.PathLike, ArchiveMember]
+
+_WARMUP_HTML = "<html><head><title>warmup</title></head><body></body></html>"
+
+
+@dataclass
+class ParseResult:
+    """The outcome of parsing one item of a batch."""
+
+    index: int
+    source: str | None
+    page: YtPage | YtPageSearch | None
+    error: str | None = None
+    # Metrics a worker process recorded for its chunk, see collect_metrics.
+    metrics: dict[str, Any] | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self, urls: bool = True) -> dict[str, Any]:
+        return {
+            "index": self.index,
+            "source": self.source,
+            "ok": self.ok,
+            "error": self.error,
+            "result": self.page.to_dict(urls) if self.page is not None else None,
+        }
+
+
+def is_html_file(path: Path) -> bool:
+    name = path.name
+    if name.endswith(".pretty.html"):
+        return False
+    return name.endswith((".html", ".html.gz", ".html.bz2", ".html.xz"))
+
+
+def collect_inputs(inputs: Iterable[str], manifest: Path | None = None) -> list[Path]:
+    """Expand directories, glob patterns and a manifest to a list of files.
+
+    Directories are searched recursively for *.html files, compressed or not, a
+    manifest lists one path per line. Every input is expanded in sorted order
+    and a file is only listed the first time it is seen.
+    """
+    paths: list[Path] = []
+    for entry in inputs:
+        path = Path(entry)
+        if path.is_dir():
+            paths.extend(sorted(file for file in path.rglob("*") if is_html_file(file)))
+        elif any(char in entry for char in "*?["):
+            paths.extend(
+                Path(match) for match in sorted(glob.glob(entry, recursive=True))
+            )
+        else:
+            paths.append(path)
+    if manifest is not None:
+        lines = manifest.read_text(encoding="utf-8").splitlines()
+        paths.extend(Path(line.strip()) for line in lines if line.strip())
+    seen: set[Path] = set()
+    out: list[Path] = []
+    for path in paths:
+        if path not in seen:
+            seen.add(path)
+            out.append(path)
+    return out
+
+
+def write_jsonl(
+    results: Iterable[ParseResult], out: IO[bytes], urls: bool = True
+) -> tuple[int, int]:
+    """Write one json object per result, returns the counts of ok and failed."""
+    writer = NdjsonWriter(out, urls=urls)
+    failed = 0
+    for result in results:
+        writer.write(result)
+        failed += 0 if result.ok else 1
+    return writer.count - failed, failed
+
+
+# Workers are started from a fork server, or spawned where there is none, so
+# they do not inherit the sockets and threads of a server that forks them.
+POOL_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+# How long create_pool waits for all of its workers to be up.
+WORKER_START_TIMEOUT = 60.0
+
+# The barrier of the pool a worker belongs to, set by warm_worker.
+_STARTED: Any = None
+
+
+def warm_worker(
+    metrics: bool = False, profile: ProfileConfig | None = None, started: Any = None
+) -> None:
+    """Pool initializer, pays the import and lxml set up cost once per worker."""
+    global _STARTED  # pylint: disable=global-statement
+    # Ctrl-C is handled by the parent, which shuts the pool down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    create_soup(_WARMUP_HTML)
+    create_soup(_WARMUP_HTML, restricted=True)
+    # The warm up is not a parse.
+    REGISTRY.reset()
+    REGISTRY.enable(metrics)
+    PROFILER.configure(profile)
+    _STARTED = started
+
+
+def _wait_for_workers() -> None:
+    """Block until every worker of the pool has been started and warmed up."""
+    _STARTED.wait(WORKER_START_TIMEOUT)
+
+
+def create_pool(
+    jobs: int | None = None, max_tasks_per_child: int | None = None
+) -> ProcessPoolExecutor:
+    """Create a process pool whose workers are all started and warmed up.
+
+    Create it before binding any socket, the fork server is started from the
+    calling process. Workers replaced later on come from that fork server.
+    """
+    kwargs: dict[str, Any] = {}
+    if max_tasks_per_child is not None:
+        # The warm up below is a task too, workers replaced later on do not
+        # run it and parse one page more.
+        kwargs["max_tasks_per_child"] = max_tasks_per_child + 1
+    context = multiprocessing.get_context(POOL_START_METHOD)
+    if POOL_START_METHOD == "forkserver":
+        context.set_forkserver_preload(["youtube_html_parser.batch"])
+    workers = jobs or os.cpu_count() or 1
+    started = context.Barrier(workers)
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=warm_worker,
+        initargs=(REGISTRY.enabled, PROFILER.config, started),
+        **kwargs,
+    )
+    # A worker is only spawned when no other is idle, and none is before all
+    # of them have reached the barrier.
+    try:
+        for future in [pool.submit(_wait_for_workers) for _ in range(workers)]:
+            future.result()
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    return pool
+
+
+def parse_item(
+    item: BatchItem, search: bool = False, rich: bool = False
+) -> YtPage | YtPageSearch:
+    """Parse one item, a path is read from disk while str/bytes are parsed as is.
+
+    rich is passed on to the search parser.
+    """
+    if isinstance(item, os.PathLike):
+        with open_html_bytes(Path(item)) as data:
+            if search:
+                return parse_yt_page_seach_bytes(data, rich=rich)
+            return parse_yt_page_bytes(data)
+    if isinstance(item, ArchiveMember):
+        item = decompress_bytes(item.data)
+    if isinstance(item, str):
+        if search:
+            return parse_yt_page_seach(item, rich=rich)
+        return parse_yt_page(item)
+    if search:
+        return parse_yt_page_seach_bytes(item, rich=rich)
+    return parse_yt_page_bytes(item)
+
+
+def _source(item: BatchItem) -> str | None:
+    if isinstance(item, ArchiveMember):
+        return item.name
+    return os.fspath(item) if isinstance(item, os.PathLike) else None
+
+
+def parse_chunk(
+    chunk: list[tuple[int, BatchItem]],
+    search: bool = False,
+    profile: bool = False,
+    rich: bool = False,
+) -> list[ParseResult]:
+    """Parse a chunk of items, errors are recorded per item instead of raised.
+
+    With profile set every item is profiled if the profiler is configured.
+    """
+    out: list[ParseResult] = []
+    with warnings.catch_warnings(), PROFILER.forced() if profile else nullcontext():
+        warnings.simplefilter("ignore")
+        for index, item in chunk:
+            source = _source(item)
+            try:
+                page = parse_item(item, search=search, rich=rich)
+                out.append(ParseResult(index=index, source=source, page=page))
+            except Exception as e:  # pylint: disable=broad-except
+                error = f"{type(e).__name__}: {e}"
+                out.append(
+                    ParseResult(index=index, source=source, page=None, error=error)
+                )
+    if out and REGISTRY.enabled and multiprocessing.parent_process() is not None:
+        out[-1].metrics = REGISTRY.take()
+    return out
+
+
+def collect_metrics(results: list[ParseResult]) -> list[ParseResult]:
+    """Merge the metrics of results from a worker into this process."""
+    for result in results:
+        if result.metrics is not None:
+            REGISTRY.merge(result.metrics)
+            result.metrics = None
+    return results
+
+
+def _chunks(
+    items: Iterable[BatchItem], chunksize: int
+) -> Iterator[list[tuple[int, BatchItem]]]:
+    it = enumerate(items)
+    while True:
+        chunk = list(islice(it, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _failed_chunk(
+    chunk: list[tuple[int, BatchItem]], error: BaseException
+) -> list[ParseResult]:
+    message = f"{type(error).__name__}: {error}"
+    return [
+        ParseResult(index=index, source=_source(item), page=None, error=message)
+        for index, item in chunk
+    ]
+
+
+class _ChunkRunner:
+    """Submits chunks to the pool and survives the death of a worker.
+
+    A killed worker breaks the pool, the chunks it had in flight become error
+    results and, with replace_pool, the rest of the batch goes to the pool
+    it returns. Without it the remaining chunks fail the same way.
+    """
+
+    def __init__(
+        self,
+        executor: ProcessPoolExecutor,
+        replace_pool: Callable[[ProcessPoolExecutor], ProcessPoolExecutor] | None,
+        search: bool,
+        rich: bool,
+    ) -> None:
+        self.executor = executor
+        self.replace_pool = replace_pool
+        self.search = search
+        self.rich = rich
+        self._submitted: dict[Future[list[ParseResult]], ProcessPoolExecutor] = {}
+
+    def submit(self, chunk: list[tuple[int, BatchItem]]) -> Future[list[ParseResult]]:
+        try:
+            future = self._submit(chunk)
+        except BrokenProcessPool as e:
+            if self.replace_pool is None:
+                failed: Future[list[ParseResult]] = Future()
+                failed.set_result(_failed_chunk(chunk, e))
+                return failed
+            self._replace(self.executor)
+            future = self._submit(chunk)
+        return future
+
+    def result(
+        self, future: Future[list[ParseResult]], chunk: list[tuple[int, BatchItem]]
+    ) -> list[ParseResult]:
+        executor = self._submitted.pop(future, None)
+        try:
+            return collect_metrics(future.result())
+        except BrokenProcessPool as e:
+            if executor is not None:
+                self._replace(executor)
+            return _failed_chunk(chunk, e)
+
+    def _submit(self, chunk: list[tuple[int, BatchItem]]) -> Future[list[ParseResult]]:
+        executor = self.executor
+        future = executor.submit(parse_chunk, chunk, self.search, False, self.rich)
+        self._submitted[future] = executor
+        return future
+
+    def _replace(self, broken: ProcessPoolExecutor) -> None:
+        # Only once per broken pool, its other chunks fail on their own.
+        if self.replace_pool is not None and broken is self.executor:
+            self.executor = self.replace_pool(broken)
+
+
+def _pool_replacer(
+    jobs: int | None,
+) -> Callable[[ProcessPoolExecutor], ProcessPoolExecutor]:
+    def replace(broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        broken.shutdown(wait=False, cancel_futures=True)
+        return create_pool(jobs)
+
+    return replace
+
+
+def _results_ordered(
+    runner: _ChunkRunner,
+    chunks: Iterator[list[tuple[int, BatchItem]]],
+    max_pending: int,
+) -> Iterator[ParseResult]:
+    queue: deque[tuple[Future[list[ParseResult]], list[tuple[int, BatchItem]]]]
+    queue = deque()
+    for chunk in chunks:
+        queue.append((runner.submit(chunk), chunk))
+        if len(queue) >= max_pending:
+            yield from runner.result(*queue.popleft())
+    while queue:
+        yield from runner.result(*queue.popleft())
+
+
+def _results_as_completed(
+    runner: _ChunkRunner,
+    chunks: Iterator[list[tuple[int, BatchItem]]],
+    max_pending: int,
+) -> Iterator[ParseResult]:
+    pending: dict[Future[list[ParseResult]], list[tuple[int, BatchItem]]] = {}
+    for chunk in chunks:
+        pending[runner.submit(chunk)] = chunk
+        if len(pending) < max_pending:
+            continue
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield from runner.result(future, pending.pop(future))
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield from runner.result(future, pending.pop(future))
+
+
+def parse_many(  # pylint: disable=too-many-arguments
+    items: Iterable[BatchItem],
+    jobs: int | None = None,
+    *,
+    chunksize: int = 1,
+    ordered: bool = True,
+    search: bool = False,
+    rich: bool = False,
+    pool: ProcessPoolExecutor | None = None,
+    replace_pool: Callable[[ProcessPoolExecutor], ProcessPoolExecutor] | None = None,
+) -> Iterator[ParseResult]:
+    """Parse many pages in parallel, yielding one ParseResult per item.
+
+    Items are html strings/bytes, paths to html files or archive members.
+    Results come back in input order when ordered is set, otherwise as soon
+    as each chunk is done. A failing item is reported through
+    ParseResult.error and the rest of the batch carries on. jobs=1 parses in
+    the calling process. Pass a pool from create_pool to reuse warm workers
+    across batches. rich is passed on to the search parser.
+
+    When a worker dies the items of its chunks become error results too, the
+    batch goes on in a new pool when it owns the pool, else in the one
+    replace_pool returns for the broken pool.
+    """
+    assert chunksize > 0, "chunksize must be positive."
+    chunks = _chunks(items, chunksize)
+    if jobs == 1 and pool is None:
+        for chunk in chunks:
+            yield from parse_chunk(chunk, search, False, rich)
+        return
+    owns_pool = pool is None
+    if owns_pool:
+        replace_pool = _pool_replacer(jobs)
+    runner = _ChunkRunner(pool or create_pool(jobs), replace_pool, search, rich)
+    # Only keep a few chunks in flight so a huge iterable is not read up front.
+    max_pending = 2 * (jobs or os.cpu_count() or 1)
+    results = _results_ordered if ordered else _results_as_completed
+    try:
+        yield from results(runner, chunks, max_pending)
+    finally:
+        if owns_pool:
+            runner.executor.shutdown(cancel_futures=True)
@@ -0,0 +1,220 @@
+"""
+Benchmark of the parser, per stage timings over a corpus of pages.
+"""
+
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Any, Callable
+
+from youtube_html_parser.cache import PARSER_VERSION
+from youtube_html_parser.jsonparse import parse_yt_page_json
+from youtube_html_parser.parser import (
+    create_soup,
+    parse_channel_url,
+    parse_out_self_video_ids,
+    parse_out_up_next_videos,
+    parse_title,
+    parse_yt_page_bytes,
+    parse_yt_page_seach_bytes,
+)
+from youtube_html_parser.scanner import HtmlScan
+
+DEFAULT_TOLERANCE = 0.25
+
+# Keys of a report that are checked against a baseline, higher is worse.
+REGRESSION_KEYS = ["p50_ms", "p99_ms"]
+# Stages that take a few milliseconds are too noisy to compare by ratio alone.
+MIN_REGRESSION_MS = 2.0
+
+
+def collect_pages(paths: list[Path]) -> list[Path]:
+    """Expand directories to the *.html files in them."""
+    out: list[Path] = []
+    for path in paths:
+        if path.is_dir():
+            out.extend(sorted(path.glob("*.html")))
+        else:
+            out.append(path)
+    return [file for file in out if not file.name.endswith(".pretty.html")]
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _timed(timings: dict[str, list[float]], stage: str, func: Callable[[], Any]) -> Any:
+    start = time.perf_counter()
+    try:
+        return func()
+    except AssertionError:
+        return None
+    finally:
+        timings.setdefault(stage, []).append(time.perf_counter() - start)
+
+
+def _time_watch_page(data: bytes, timings: dict[str, list[float]]) -> None:
+    html = _timed(timings, "decode", lambda: data.decode("utf-8"))
+    scan = HtmlScan(html)
+    _timed(timings, "json", lambda: parse_yt_page_json(html, scan))
+    soup = _timed(timings, "soup", lambda: create_soup(html, restricted=True))
+    _timed(timings, "title", lambda: parse_title(soup))
+    _timed(timings, "self_video_ids", lambda: parse_out_self_video_ids(soup))
+    _timed(timings, "up_next", lambda: parse_out_up_next_videos(soup, html, scan))
+    _timed(timings, "channel", lambda: parse_channel_url(html, scan))
+    _timed(timings, "total", lambda: parse_yt_page_bytes(data))
+
+
+def _time_search_page(data: bytes, timings: dict[str, list[float]]) -> None:
+    _timed(timings, "decode", lambda: data.decode("utf-8"))
+    _timed(timings, "search", lambda: parse_yt_page_seach_bytes(data))
+    _timed(timings, "total", lambda: parse_yt_page_seach_bytes(data))
+
+
+def _peak_memory(pages: list[tuple[bytes, bool]]) -> int:
+    peak = 0
+    for data, search in pages:
+        tracemalloc.start()
+        try:
+            if search:
+                parse_yt_page_seach_bytes(data)
+            else:
+                try:
+                    parse_yt_page_bytes(data)
+                except AssertionError:
+                    pass
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return peak
+
+
+def _stage_stats(values: list[float]) -> dict[str, float]:
+    values_ms = [value * 1000 for value in values]
+    return {
+        "count": len(values_ms),
+        "mean_ms": sum(values_ms) / len(values_ms),
+        "p50_ms": _percentile(values_ms, 50),
+        "p99_ms": _percentile(values_ms, 99),
+    }
+
+
+def run_benchmark(
+    watch_pages: list[Path],
+    search_pages: list[Path] | None = None,
+    repeat: int = 3,
+    memory: bool = True,
+) -> dict[str, Any]:
+    """Time every stage of the parser over the pages, returns a json report."""
+    pages = [(file.read_bytes(), False) for file in watch_pages]
+    pages += [(file.read_bytes(), True) for file in search_pages or []]
+    assert pages, "No pages to benchmark."
+    timings: dict[str, list[float]] = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for _ in range(repeat):
+            for data, search in pages:
+                if search:
+                    _time_search_page(data, timings)
+                else:
+                    _time_watch_page(data, timings)
+        peak = _peak_memory(pages) if memory else None
+    total = timings["total"]
+    return {
+        "parser_version": PARSER_VERSION,
+        "python": platform.python_version(),
+        "pages": len(pages),
+        "repeat": repeat,
+        "pages_per_sec": len(total) / sum(total),
+        "stages": {stage: _stage_stats(values) for stage, values in timings.items()},
+        "peak_memory_bytes": peak,
+    }
+
+
+def compare_to_baseline(
+    report: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[str]:
+    """List the measurements that are worse than the baseline by more than tolerance."""
+    regressions: list[str] = []
+    limit = 1 + tolerance
+    for stage, stats in baseline.get("stages", {}).items():
+        current = report["stages"].get(stage)
+        if current is None:
+            continue
+        for key in REGRESSION_KEYS:
+            slower = current[key] - stats[key]
+            if current[key] > stats[key] * limit and slower > MIN_REGRESSION_MS:
+                regressions.append(
+                    f"{stage} {key}: {current[key]:.2f} > {stats[key]:.2f}"
+                )
+    if report["pages_per_sec"] * limit < baseline["pages_per_sec"]:
+        regressions.append(
+            f"pages_per_sec: {report['pages_per_sec']:.2f}"
+            f" < {baseline['pages_per_sec']:.2f}"
+        )
+    base_peak = baseline.get("peak_memory_bytes")
+    peak = report.get("peak_memory_bytes")
+    if base_peak and peak and peak > base_peak * limit:
+        regressions.append(f"peak_memory_bytes: {peak} > {base_peak}")
+    return regressions
+
+
+def main() -> int:
+    """Run the benchmark, exits with 1 when it regressed against the baseline."""
+    parser = ArgumentParser(description="Benchmark the parser.")
+    parser.add_argument(
+        "pages", nargs="*", type=Path, help="Watch pages or directories of them."
+    )
+    parser.add_argument(
+        "--search",
+        nargs="*",
+        type=Path,
+        default=[],
+        help="Search pages or directories of them.",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output-json", type=Path, help="Write the report here.")
+    parser.add_argument("--baseline", type=Path, help="Report to compare against.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc.")
+    args = parser.parse_args()
+    watch_paths = args.pages
+    search_paths = args.search
+    if not watch_paths and not search_paths:
+        # The layout of the test corpus of this repo.
+        data_dir = Path("tests") / "data"
+        watch_paths = [data_dir, data_dir / "error"]
+        search_paths = [data_dir / "search_html"]
+    report = run_benchmark(
+        collect_pages(watch_paths),
+        collect_pages(search_paths),
+        repeat=args.repeat,
+        memory=not args.no_memory,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output_json:
+        args.output_json.write_text(text, encoding="utf-8")
+    print(text)
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Content addressed cache of parse results.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from copy import deepcopy
+from dataclasses import asdict
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from youtube_html_parser.types import HtmlSource
+from youtube_html_parser.ytpage import YtPage
+from youtube_html_parser.ytpagesearch import YtPageSearch
+
+# Bump when the parse output changes without a package version bump.
+CACHE_FORMAT = 1
+
+PAGE_TYPES: dict[str, type] = {"page": YtPage, "search": YtPageSearch}
+
+T = TypeVar("T", bound=YtPage | YtPageSearch)
+
+
+def _parser_version() -> str:
+    try:
+        package_version = version("youtube_html_parser")
+    except PackageNotFoundError:
+        package_version = "unknown"
+    return f"{package_version}-{CACHE_FORMAT}"
+
+
+PARSER_VERSION = _parser_version()
+
+
+def html_digest(html: HtmlSource, kind: str = "page") -> str:
+    """Key of the html, the parse kind and the parser version."""
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(f"{PARSER_VERSION}:{kind}:".encode("utf-8"))
+    hasher.update(html.encode("utf-8") if isinstance(html, str) else html)
+    return hasher.hexdigest()
+
+
+class ParseCache:
+    """Bounded in memory LRU of parse results, optionally backed by a directory.
+
+    Entries on disk are json files named by their key, the least recently
+    used ones are deleted once the directory grows past max_disk_bytes. The
+    directory may be shared between processes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        directory: Path | str | None = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, YtPage | YtPageSearch] = OrderedDict()
+        self._disk_bytes: int | None = None
+        self._counts: Counter[str] = Counter()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> YtPage | YtPageSearch | None:
+        """Cached result for the key, or None."""
+        with self._lock:
+            page = self._memory.get(key)
+            if page is not None:
+                self._memory.move_to_end(key)
+                self._counts["hits"] += 1
+                return deepcopy(page)
+        page = self._read_disk(key)
+        with self._lock:
+            if page is None:
+                self._counts["misses"] += 1
+                return None
+            self._counts["disk_hits"] += 1
+            self._remember(key, page)
+        return deepcopy(page)
+
+    def put(self, key: str, page: YtPage | YtPageSearch) -> None:
+        """Store a result in memory and on disk."""
+        page = deepcopy(page)
+        with self._lock:
+            self._remember(key, page)
+        self._write_disk(key, page)
+
+    def parse(self, html: HtmlSource, kind: str, parse: Callable[[], T]) -> T:
+        """Return the cached result for the html or parse and store it."""
+        key = html_digest(html, kind)
+        page = self.get(key)
+        if page is not None:
+            return page  # type: ignore[return-value]
+        out = parse()
+        self.put(key, out)
+        return out
+
+    def stats(self) -> dict[str, Any]:
+        """Hit and miss counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self._counts["hits"],
+                "disk_hits": self._counts["disk_hits"],
+                "misses": self._counts["misses"],
+                "entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def clear(self) -> None:
+        """Drop every entry, including the ones on disk."""
+        with self._lock:
+            self._memory.clear()
+            if self.directory is not None:
+                for path in self.directory.glob("*/*.json"):
+                    path.unlink(missing_ok=True)
+                self._disk_bytes = 0
+
+    def _remember(self, key: str, page: YtPage | YtPageSearch) -> None:
+        self._memory[key] = page
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> YtPage | YtPageSearch | None:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            page = PAGE_TYPES[data["kind"]](**data["page"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        # The mtime is the recency used for eviction.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return page
+
+    def _write_disk(self, key: str, page: YtPage | YtPageSearch) -> None:
+        if self.directory is None:
+            return
+        kind = "search" if isinstance(page, YtPageSearch) else "page"
+        data = json.dumps({"kind": kind, "page": asdict(page)}).encode("utf-8")
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        # Write then rename so a concurrent reader never sees half a file.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        os.replace(tmp, path)
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._measure_disk()
+            else:
+                self._disk_bytes += len(data) - replaced
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _measure_disk(self) -> int:
+        assert self.directory is not None
+        total = 0
+        for path in self.directory.glob("*/*.json"):
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _evict_disk(self) -> None:
+        # Oldest first, down to three quarters of the limit.
+        assert self.directory is not None
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 3 // 4
+        for _, size, path in entries:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._disk_bytes = total
@@ -2,57 +2,252 @@
 Main entry point.
 """
 
+# pylint: disable=import-outside-toplevel
+
+import json
+import os
 import sys
 import time
-from argparse import ArgumentParser
-
-# import gunzip
-from gzip import GzipFile
+from argparse import ArgumentParser, Namespace
+from itertools import chain
 from pathlib import Path
-from tempfile import TemporaryDirectory
-
-from youtube_html_parser.parser import (
-    YtPage,
-    YtPageSearch,
-    parse_yt_page,
-    parse_yt_page_seach,
-)
-
-
-def extract_html(infile: Path) -> str:
-    """Extract the HTML from the file."""
-    if infile.suffix == ".html":
-        return infile.read_text(encoding="utf-8")
-    if infile.suffix == ".gz":
-        with TemporaryDirectory() as temp_dir:
-            temp_dir_path = Path(temp_dir)
-            temp_file = temp_dir_path / "temp.html"
-            with GzipFile(infile, "r") as gzfile:
-                data = gzfile.read()
-                temp_file.write_text(data.decode("utf-8"), encoding="utf-8")
-            return temp_file.read_text(encoding="utf-8")
-    return infile.read_text(encoding="utf-8")
+from typing import TYPE_CHECKING, Iterable
 
+from youtube_html_parser.htmlfile import extract_html, open_html_bytes
+from youtube_html_parser.types import HtmlBytes
 
-def main() -> int:
-    """Main entry point for the template_python_cmd package."""
+if TYPE_CHECKING:
+    from youtube_html_parser.batch import BatchItem
+    from youtube_html_parser.ytpage import YtPage
+    from youtube_html_parser.ytpagesearch import YtPageSearch
+
+# extract_html used to live here.
+__all__ = ["extract_html", "main"]
+
+# bs4 and lxml are only imported once a page has to be parsed, so that --help
+# and cache hits start fast.
+
+
+def parse_data(
+    data: HtmlBytes, search: bool, rich: bool = False
+) -> "YtPage | YtPageSearch":
+    """Parse the page, importing the parser on first use."""
+    from youtube_html_parser.parser import (
+        parse_yt_page_bytes,
+        parse_yt_page_seach_bytes,
+    )
+
+    if search:
+        return parse_yt_page_seach_bytes(data, rich=rich)
+    return parse_yt_page_bytes(data)
+
+
+def run_batch(args: Namespace) -> int:
+    """Parse every page of the batch inputs to one JSON object per line."""
+    from youtube_html_parser.archive import iter_archive
+    from youtube_html_parser.batch import collect_inputs, parse_many, write_jsonl
+
+    start_time = time.time()
+    manifest = Path(args.manifest) if args.manifest else None
+    inputs: "Iterable[BatchItem]" = collect_inputs(args.batch or [], manifest)
+    for archive in args.archive or []:
+        inputs = chain(inputs, iter_archive(Path(archive)))
+    results = parse_many(inputs, jobs=args.jobs, search=args.search, rich=args.rich)
+    urls = not args.compact
+    if args.output_jsonl == "-":
+        ok, failed = write_jsonl(results, sys.stdout.buffer, urls=urls)
+        sys.stdout.flush()
+    else:
+        with open(args.output_jsonl, "wb") as out:
+            ok, failed = write_jsonl(results, out, urls=urls)
+    end_time = time.time()
+    print(
+        f"Parsed {ok} pages, {failed} errors in {end_time - start_time:.2f} seconds.",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def run_client(args: Namespace, socket_path: Path) -> bool:
+    """Have a running daemon parse the page, False when none is reachable."""
+    from youtube_html_parser.daemon import CLIENT_TIMEOUT, DaemonClient
+    from youtube_html_parser.serialize import write_json
+
+    urls = False if args.compact else None
+    try:
+        client = DaemonClient(socket_path, timeout=CLIENT_TIMEOUT)
+    except OSError:
+        print(f"No daemon on {socket_path}, parsing locally.", file=sys.stderr)
+        return False
+    with client:
+        start_time = time.time()
+        try:
+            result = client.parse(
+                path=args.input_html, search=args.search, urls=urls, rich=args.rich
+            )
+        except (OSError, ValueError) as e:
+            # A dropped, timed out or garbled reply falls back to a local parse.
+            print(
+                f"Daemon on {socket_path} failed ({e}), parsing locally.",
+                file=sys.stderr,
+            )
+            return False
+        end_time = time.time()
+    print(f"Elapsed time: {end_time - start_time:.2f} seconds.")
+    write_json(Path(args.output_json), result, compact=args.compact)
+    return True
+
+
+def make_parser() -> ArgumentParser:
     parser = ArgumentParser()
-    parser.add_argument("--input-html", help="The HTML file to parse.", required=True)
-    parser.add_argument("--output-json", help="The output json.", required=True)
+    parser.add_argument("--input-html", help="The HTML file to parse.")
+    parser.add_argument("--output-json", help="The output json.")
     parser.add_argument("--search", help="Parse a search page.", action="store_true")
+    parser.add_argument(
+        "--rich",
+        action="store_true",
+        help="With --search, list the results with their title, channel, duration"
+        " and views from ytInitialData.",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write JSON without indentation and without the URLs.",
+    )
+    parser.add_argument(
+        "--cache-dir", help="Reuse results of pages parsed before from this directory."
+    )
+    parser.add_argument(
+        "--batch",
+        nargs="+",
+        help="Directories, glob patterns or files to parse in one run.",
+    )
+    parser.add_argument("--manifest", help="A file listing one page to parse per line.")
+    parser.add_argument(
+        "--archive",
+        nargs="+",
+        help="Tar or zip archives whose html members are parsed without extracting.",
+    )
+    parser.add_argument(
+        "--output-jsonl",
+        default="-",
+        help="Where the batch results go, one JSON object per line (default stdout).",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Worker processes for a batch or the daemon (default all cores).",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a parse daemon with warm workers on the --socket.",
+    )
+    parser.add_argument(
+        "--socket",
+        help="Unix socket of the daemon, pages are sent to it when it is running"
+        " (default $YOUTUBE_HTML_PARSER_SOCKET).",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        help="Record per stage timings and fallbacks of the parser and dump them"
+        " as JSON to this file.",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        help="Save cProfile captures of parses, with their input html, here"
+        " (default $YOUTUBE_HTML_PARSER_PROFILE_DIR).",
+    )
+    parser.add_argument(
+        "--profile-every",
+        type=int,
+        help="Profile every Nth parse (default every parse without a threshold).",
+    )
+    parser.add_argument(
+        "--profile-threshold-ms",
+        type=float,
+        help="Profile the parses that take longer than this.",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Capture the allocations of profiled parses with tracemalloc too.",
+    )
+    return parser
+
+
+def main() -> int:
+    """Main entry point for the template_python_cmd package."""
+    parser = make_parser()
     args = parser.parse_args()
+    if args.profile_dir:
+        from youtube_html_parser.profiling import PROFILER, profile_config
+
+        # Before any pool is created, its workers get the same configuration.
+        PROFILER.configure(
+            profile_config(
+                args.profile_dir,
+                every=args.profile_every,
+                threshold_ms=args.profile_threshold_ms,
+                memory=args.profile_memory,
+            )
+        )
+    if not args.metrics_json:
+        return run_command(parser, args)
+    from youtube_html_parser.metrics import REGISTRY
+
+    # Before any pool is created, so its workers record as well.
+    REGISTRY.enable()
+    try:
+        return run_command(parser, args)
+    finally:
+        Path(args.metrics_json).write_text(
+            json.dumps(REGISTRY.to_dict(), indent=2), encoding="utf-8"
+        )
+
+
+def run_command(parser: ArgumentParser, args: Namespace) -> int:
+    if args.serve:
+        from youtube_html_parser.daemon import default_socket_path, serve
+
+        serve(Path(args.socket) if args.socket else default_socket_path(), args.jobs)
+        return 0
+    if args.batch or args.manifest or args.archive:
+        return run_batch(args)
+    if not args.input_html or not args.output_json:
+        parser.error(
+            "--input-html and --output-json are required without --batch or --archive."
+        )
+    socket_path = args.socket or os.environ.get("YOUTUBE_HTML_PARSER_SOCKET")
+    if socket_path and not args.cache_dir and run_client(args, Path(socket_path)):
+        return 0
     infile = Path(args.input_html)
     outfile = Path(args.output_json)
-    html = extract_html(infile)
-    start_time = time.time()
-    parsed: YtPage | YtPageSearch
-    if args.search:
-        parsed = parse_yt_page_seach(html)
-    else:
-        parsed = parse_yt_page(html)
-    end_time = time.time()
+    cache = None
+    if args.cache_dir:
+        from youtube_html_parser.cache import ParseCache
+
+        cache = ParseCache(directory=args.cache_dir)
+    parsed: "YtPage | YtPageSearch"
+    with open_html_bytes(infile) as data:
+        start_time = time.time()
+        if cache is not None:
+            kind = "page"
+            if args.search:
+                kind = "search-rich" if args.rich else "search"
+            parsed = cache.parse(
+                data, kind, lambda: parse_data(data, args.search, args.rich)
+            )
+        else:
+            parsed = parse_data(data, args.search, args.rich)
+        end_time = time.time()
     print(f"Elapsed time: {end_time - start_time:.2f} seconds.")
-    parsed.write_json(outfile)
+    if cache is not None:
+        print(f"Cache: {cache.stats()}")
+    if args.compact:
+        parsed.write_json(outfile, compact=True, urls=False)
+    else:
+        parsed.write_json(outfile)
     return 0
 
 
@@ -0,0 +1,232 @@
+"""
+Long lived parse daemon on a Unix domain socket, and its client.
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BufferedIOBase
+from pathlib import Path
+from typing import Any
+
+# The CLI hands its work to the daemon listening here when it is set.
+SOCKET_ENV = "YOUTUBE_HTML_PARSER_SOCKET"
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 256 * 1024 * 1024
+# Seconds the CLI waits on the daemon before it parses locally instead.
+CLIENT_TIMEOUT = 60.0
+
+# Wire format, both ways: one JSON header line, optionally followed by "size"
+# raw bytes. A request is {"path": ...} or {"size": n} plus the html bytes,
+# with "search", "rich" and "urls" as in the CLI. The reply is {"ok", "error",
+# "result"} where result is the to_dict() of the page.
+
+
+def default_socket_path() -> Path:
+    """The socket from the environment, else one per user in the temp dir."""
+    env = os.environ.get(SOCKET_ENV)
+    if env:
+        return Path(env)
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return Path(tempfile.gettempdir()) / f"youtube-html-parser-{uid}.sock"
+
+
+def read_message(rfile: BufferedIOBase) -> tuple[dict[str, Any], bytes] | None:
+    """Read one header and its body, None at the end of the stream."""
+    line = rfile.readline(MAX_HEADER_BYTES)
+    if not line:
+        return None
+    if not line.endswith(b"\n"):
+        raise ValueError("Header line too long or truncated.")
+    header = json.loads(line)
+    if not isinstance(header, dict):
+        raise ValueError("Header must be a JSON object.")
+    size = int(header.get("size", 0))
+    if not 0 <= size <= MAX_BODY_BYTES:
+        raise ValueError(f"Bad body size {size}.")
+    body = rfile.read(size) if size else b""
+    if len(body) != size:
+        raise ValueError("Body truncated.")
+    return header, body
+
+
+def write_message(
+    wfile: BufferedIOBase, header: dict[str, Any], body: bytes = b""
+) -> None:
+    if body:
+        header = dict(header, size=len(body))
+    wfile.write(json.dumps(header).encode("utf-8") + b"\n" + body)
+    wfile.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serves requests of one connection until the client closes it."""
+
+    server: "ParseDaemon"
+
+    def handle(self) -> None:
+        while True:
+            try:
+                message = read_message(self.rfile)
+            except ValueError as e:
+                write_message(self.wfile, {"ok": False, "error": f"Bad request: {e}"})
+                return
+            if message is None:
+                return
+            write_message(self.wfile, self.server.process(*message))
+
+
+class ParseDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Parses pages sent over a Unix socket with a pool of warm workers.
+
+    Each connection is served by its own thread, the parsing itself happens
+    in the worker processes of the pool. The pool is recreated when one of
+    its workers dies.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path | str, jobs: int | None = None) -> None:
+        from youtube_html_parser.batch import create_pool
+
+        self.socket_path = Path(socket_path)
+        _remove_stale_socket(self.socket_path)
+        self.jobs = jobs
+        self._pool_lock = threading.Lock()
+        # Started before the socket is bound, see create_pool.
+        self.pool = create_pool(jobs)
+        try:
+            super().__init__(str(self.socket_path), _Handler)
+        except BaseException:
+            self.pool.shutdown(cancel_futures=True)
+            raise
+        os.chmod(self.socket_path, 0o600)
+
+    def process(self, header: dict[str, Any], body: bytes) -> dict[str, Any]:
+        """Parse the page of one request and build the reply."""
+        from youtube_html_parser.batch import BatchItem, parse_chunk
+
+        if header.get("cmd") == "ping":
+            return {"ok": True, "error": None, "result": None}
+        item: BatchItem
+        if "path" in header:
+            item = Path(header["path"])
+        else:
+            item = body
+        search = bool(header.get("search", False))
+        rich = bool(header.get("rich", False))
+        chunk: list[tuple[int, BatchItem]] = [(0, item)]
+        pool = self.pool
+        try:
+            future = pool.submit(parse_chunk, chunk, search, False, rich)
+            result = future.result()[0]
+        except BrokenProcessPool:
+            pool = self._replace_pool(pool)
+            future = pool.submit(parse_chunk, chunk, search, False, rich)
+            result = future.result()[0]
+        if result.page is None:
+            return {"ok": False, "error": result.error, "result": None}
+        kwargs = {"urls": bool(header["urls"])} if "urls" in header else {}
+        return {"ok": True, "error": None, "result": result.page.to_dict(**kwargs)}
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """A new pool in place of one that lost a worker, once per broken pool."""
+        from youtube_html_parser.batch import create_pool
+
+        with self._pool_lock:
+            if self.pool is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.pool = create_pool(self.jobs)
+            return self.pool
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+        self.socket_path.unlink(missing_ok=True)
+
+
+def _remove_stale_socket(socket_path: Path) -> None:
+    if not socket_path.exists():
+        return
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+    except OSError:
+        # Left behind by a daemon that did not shut down cleanly.
+        socket_path.unlink()
+        return
+    raise RuntimeError(f"A daemon is already listening on {socket_path}")
+
+
+def serve(socket_path: Path | str, jobs: int | None = None) -> None:
+    """Run the daemon until interrupted or terminated."""
+    # Unwinds serve_forever so the socket file and the pool are cleaned up.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with ParseDaemon(socket_path, jobs) as server:
+        print(f"Listening on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class DaemonClient:
+    """Connection to a running daemon, usable for many requests."""
+
+    def __init__(self, socket_path: Path | str, timeout: float | None = None) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(str(socket_path))
+        except OSError:
+            self.sock.close()
+            raise
+        self.rfile = self.sock.makefile("rb")
+        self.wfile = self.sock.makefile("wb")
+
+    def parse(
+        self,
+        path: Path | str | None = None,
+        data: bytes | None = None,
+        search: bool = False,
+        urls: bool | None = None,
+        rich: bool = False,
+    ) -> dict[str, Any]:
+        """Parse a file the daemon can read, or the given html bytes.
+
+        Returns the to_dict() of the page, a failed parse raises RuntimeError.
+        """
+        assert (path is None) != (data is None), "Pass either path or data."
+        header: dict[str, Any] = {"search": search, "rich": rich}
+        if urls is not None:
+            header["urls"] = urls
+        if path is not None:
+            header["path"] = str(Path(path).absolute())
+        write_message(self.wfile, header, data or b"")
+        reply = read_message(self.rfile)
+        if reply is None:
+            raise ConnectionError("The daemon closed the connection.")
+        response = reply[0]
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def close(self) -> None:
+        self.rfile.close()
+        self.wfile.close()
+        self.sock.close()
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
@@ -0,0 +1,83 @@
+"""
+Reading of the HTML input files.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Callable, Iterator
+
+from youtube_html_parser.types import HtmlBytes
+
+Decompressor = Callable[[IO[bytes]], io.BufferedIOBase]
+
+# Magic bytes of the compressed formats the stdlib can stream.
+COMPRESSION_MAGIC: dict[bytes, Decompressor] = {
+    b"\x1f\x8b": lambda f: gzip.GzipFile(fileobj=f, mode="rb"),
+    b"BZh": lambda f: bz2.BZ2File(f, "rb"),
+    b"\xfd7zXZ\x00": lambda f: lzma.LZMAFile(f, "rb"),
+}
+MAGIC_SIZE = max(len(magic) for magic in COMPRESSION_MAGIC)
+
+
+def sniff_compression(head: bytes) -> Decompressor | None:
+    """The decompressor for the first bytes of a file, None when not compressed."""
+    for magic, opener in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return opener
+    return None
+
+
+def decompress_bytes(data: bytes) -> bytes:
+    """Decompress gzip, bz2 or xz data, anything else is returned as is."""
+    opener = sniff_compression(data[:MAGIC_SIZE])
+    if opener is None:
+        return data
+    with opener(io.BytesIO(data)) as stream:
+        return stream.read()
+
+
+@contextmanager
+def open_decompressed(infile: Path) -> Iterator[IO[bytes] | io.BufferedIOBase]:
+    """Open the file for reading, gzip, bz2 and xz are decompressed as it is read."""
+    with open(infile, "rb") as f:
+        opener = sniff_compression(f.read(MAGIC_SIZE))
+        f.seek(0)
+        if opener is None:
+            yield f
+            return
+        with opener(f) as stream:
+            yield stream
+
+
+def extract_html(infile: Path) -> str:
+    """Extract the HTML from the file."""
+    with open_decompressed(infile) as f:
+        return f.read().decode("utf-8")
+
+
+@contextmanager
+def open_html_bytes(infile: Path) -> Iterator[HtmlBytes]:
+    """Open the HTML as undecoded bytes, plain files are mmapped.
+
+    Compressed files are decompressed into memory without going through a
+    temporary file.
+    """
+    with open(infile, "rb") as f:
+        opener = sniff_compression(f.read(MAGIC_SIZE))
+        f.seek(0)
+        if opener is not None:
+            with opener(f) as stream:
+                yield stream.read()
+            return
+        if os.fstat(f.fileno()).st_size == 0:
+            # empty files can not be mmapped
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
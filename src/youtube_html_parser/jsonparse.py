@@ -0,0 +1,531 @@
+"""
+Soup-free parsing of watch and search pages from the embedded ytInitialData
+and ytInitialPlayerResponse JSON blobs.
+"""
+
+import json
+import re
+from json.decoder import scanstring  # type: ignore[attr-defined]
+from typing import Any, Iterable, Iterator, Sequence
+
+from youtube_html_parser.scanner import HtmlScan
+from youtube_html_parser.types import ChannelId, HtmlSource, VideoId
+from youtube_html_parser.ytpage import YtPage
+from youtube_html_parser.ytpagesearch import SearchResult, YtPageSearch
+
+YT_INITIAL_DATA = "ytInitialData"
+YT_INITIAL_PLAYER_RESPONSE = "ytInitialPlayerResponse"
+
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# The only values the watch page parsers read, see extract_json_paths.
+WATCH_INITIAL_DATA_PATHS = [
+    ("contents", "twoColumnWatchNextResults", "results", "results", "contents"),
+    (
+        "contents",
+        "twoColumnWatchNextResults",
+        "secondaryResults",
+        "secondaryResults",
+        "results",
+    ),
+    ("currentVideoEndpoint", "watchEndpoint", "videoId"),
+]
+# Without it ytInitialData is not a watch page, see parse_yt_page_json.
+WATCH_REQUIRED_PATH = ("contents", "twoColumnWatchNextResults")
+WATCH_PLAYER_RESPONSE_PATHS = [
+    ("videoDetails", "videoId"),
+    ("videoDetails", "title"),
+    ("videoDetails", "channelId"),
+]
+# A results page has the first, a browse page like the home page the second.
+SEARCH_INITIAL_DATA_PATHS = [
+    (
+        "contents",
+        "twoColumnSearchResultsRenderer",
+        "primaryContents",
+        "sectionListRenderer",
+        "contents",
+    ),
+    ("contents", "twoColumnBrowseResultsRenderer", "tabs"),
+]
+
+# An exact count like "18,163,353 views", not an abbreviated "18M views".
+RE_EXACT_COUNT = re.compile(r"(\d[\d,.\u00a0\u202f]*)(?:\s|$)")
+
+
+def find_json_blob_start(
+    html: HtmlSource, name: str, scan: HtmlScan | None = None
+) -> int:
+    """Return the offset of the opening brace of the named blob, or -1."""
+    scan = scan or HtmlScan(html)
+    return scan.json_blob_offsets.get(name, -1)
+
+
+def decode_json_blob(
+    html: HtmlSource, start: int, scan: HtmlScan | None = None
+) -> dict[str, Any]:
+    """Decode only the JSON object that begins at start."""
+    if isinstance(html, str):
+        obj, _ = _JSON_DECODER.raw_decode(html, start)
+    else:
+        # Only the enclosing script is decoded, the blob can not contain
+        # "</script" since youtube escapes "<" inside of it.
+        scan = scan or HtmlScan(html)
+        text = scan.text(start, scan.script_end(start))
+        obj, _ = _JSON_DECODER.raw_decode(text)
+    assert isinstance(obj, dict), f"Expected a JSON object at offset {start}."
+    return obj
+
+
+def find_json_blob(
+    html: HtmlSource, name: str, scan: HtmlScan | None = None
+) -> dict[str, Any] | None:
+    """Locate and decode the named blob, returns None if it is not present."""
+    start = find_json_blob_start(html, name, scan)
+    if start == -1:
+        return None
+    try:
+        return decode_json_blob(html, start, scan)
+    except (ValueError, AssertionError):
+        return None
+
+
+class _AllFound(Exception):
+    """Unwinds the walk once every path was decoded or a required key is missing."""
+
+
+def extract_json_paths(
+    text: str,
+    start: int,
+    paths: Iterable[Sequence[str]],
+    required: Sequence[str] = (),
+) -> dict[str, Any]:
+    """Decode only the values at the key paths of the object that begins at start.
+
+    Returns a sparse copy of the object with just those values, missing paths
+    are left out, so the _get walks work on it as on the whole object. The
+    values of other keys are skipped by the C decoder without being kept and
+    the scan stops as soon as every path was found. Paths only go through
+    objects and none may be a prefix of another. required is a prefix of the
+    paths that the caller gives up without, the scan also stops once a key
+    along it is known to be missing.
+    """
+    wanted: dict[str, Any] = {}
+    count = 0
+    for path in paths:
+        node = wanted
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = None
+        count += 1
+    # The wanted node each required key is looked up in, with that key.
+    required_keys: list[tuple[dict[str, Any], str]] = []
+    node = wanted
+    for key in required:
+        assert isinstance(node.get(key), dict), f"{required} is not a path prefix."
+        required_keys.append((node, key))
+        node = node[key]
+    out: dict[str, Any] = {}
+    if text[start] != "{":
+        raise ValueError(f"Expected a JSON object at offset {start}.")
+    try:
+        _extract_object(text, start, wanted, out, [count], required_keys)
+    except _AllFound:
+        pass
+    return out
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    match = _WHITESPACE.match(text, pos)
+    assert match is not None
+    return match.end()
+
+
+def _extract_object(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    text: str,
+    pos: int,
+    wanted: dict[str, Any],
+    out: dict[str, Any],
+    remaining: list[int],
+    required: list[tuple[dict[str, Any], str]],
+) -> int:
+    """Walk the keys of the object at pos, returns the offset after it."""
+    pos = _skip_whitespace(text, pos + 1)
+    if text[pos] == "}":
+        _check_required(wanted, out, required)
+        return pos + 1
+    while True:
+        if text[pos] != '"':
+            raise ValueError(f"Expected a key at offset {pos}.")
+        key, pos = scanstring(text, pos + 1)
+        pos = _skip_whitespace(text, pos)
+        if text[pos] != ":":
+            raise ValueError(f"Expected ':' at offset {pos}.")
+        pos = _skip_whitespace(text, pos + 1)
+        node = wanted.get(key, False)
+        if node is None:
+            out[key], pos = _JSON_DECODER.raw_decode(text, pos)
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                raise _AllFound()
+        elif node and text[pos] == "{":
+            child: dict[str, Any] = {}
+            out[key] = child
+            try:
+                pos = _extract_object(text, pos, node, child, remaining, required)
+            finally:
+                # Also when the walk unwinds, the copy only holds found values.
+                if not child:
+                    del out[key]
+        else:
+            _, pos = _JSON_DECODER.raw_decode(text, pos)
+        _check_required(wanted, out, required, key)
+        pos = _skip_whitespace(text, pos)
+        if text[pos] == "}":
+            _check_required(wanted, out, required)
+            return pos + 1
+        if text[pos] != ",":
+            raise ValueError(f"Expected ',' or '}}' at offset {pos}.")
+        pos = _skip_whitespace(text, pos + 1)
+
+
+def _check_required(
+    wanted: dict[str, Any],
+    out: dict[str, Any],
+    required: list[tuple[dict[str, Any], str]],
+    key: str | None = None,
+) -> None:
+    """Stop the walk when the key just walked, or with None any key of the
+    object that closed, is required and missing."""
+    for node, name in required:
+        if node is wanted and key in (None, name) and name not in out:
+            raise _AllFound()
+
+
+def find_json_paths(
+    html: HtmlSource,
+    name: str,
+    paths: Iterable[Sequence[str]],
+    scan: HtmlScan | None = None,
+    required: Sequence[str] = (),
+) -> dict[str, Any] | None:
+    """Like find_json_blob but only the given paths are decoded."""
+    start = find_json_blob_start(html, name, scan)
+    if start == -1:
+        return None
+    if isinstance(html, str):
+        text = html
+    else:
+        scan = scan or HtmlScan(html)
+        text = scan.text(start, scan.script_end(start))
+        start = 0
+    try:
+        return extract_json_paths(text, start, paths, required)
+    except (ValueError, IndexError):
+        return None
+
+
+def _get(obj: Any, *path: str) -> Any:
+    """Walk the path through nested dicts, None if any step is missing."""
+    for key in path:
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    return obj
+
+
+def _runs_text(obj: Any) -> str | None:
+    """Join the text of a {"runs": [...]} or {"simpleText": ...} node."""
+    if not isinstance(obj, dict):
+        return None
+    if "simpleText" in obj:
+        return obj["simpleText"]
+    runs = obj.get("runs")
+    if not runs:
+        return None
+    return "".join(run.get("text", "") for run in runs)
+
+
+def _watch_contents(initial_data: dict[str, Any]) -> list[Any]:
+    contents = _get(
+        initial_data, "contents", "twoColumnWatchNextResults", "results", "results"
+    )
+    return _get(contents, "contents") or []
+
+
+def _iter_related_items(items: list[Any]):
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        section = item.get("itemSectionRenderer")
+        if section is not None:
+            yield from _iter_related_items(section.get("contents") or [])
+            continue
+        yield item
+
+
+def parse_up_next_videos_json(initial_data: dict[str, Any]) -> list[VideoId]:
+    """Parse out the up next videos from the secondary results."""
+    results = _get(
+        initial_data,
+        "contents",
+        "twoColumnWatchNextResults",
+        "secondaryResults",
+        "secondaryResults",
+        "results",
+    )
+    assert results is not None, "Could not find secondary results in ytInitialData."
+    video_ids: list[VideoId] = []
+    for item in _iter_related_items(results):
+        video_id = _get(item, "compactVideoRenderer", "videoId")
+        if video_id is None:
+            lockup = item.get("lockupViewModel")
+            if _get(lockup, "contentType") == "LOCKUP_CONTENT_TYPE_VIDEO":
+                video_id = _get(lockup, "contentId")
+        if video_id is not None:
+            video_ids.append(VideoId(video_id))
+    return video_ids
+
+
+def parse_self_video_id_json(
+    initial_data: dict[str, Any], player_response: dict[str, Any] | None
+) -> VideoId | None:
+    """Parse out the video id of the page itself."""
+    video_id = _get(initial_data, "currentVideoEndpoint", "watchEndpoint", "videoId")
+    if video_id is None:
+        video_id = _get(player_response, "videoDetails", "videoId")
+    return VideoId(video_id) if video_id else None
+
+
+def parse_title_json(
+    initial_data: dict[str, Any], player_response: dict[str, Any] | None
+) -> str | None:
+    """Parse the title of the video."""
+    title = _get(player_response, "videoDetails", "title")
+    if title:
+        return title
+    for item in _watch_contents(initial_data):
+        primary = _get(item, "videoPrimaryInfoRenderer", "title")
+        if primary is not None:
+            return _runs_text(primary)
+    return None
+
+
+def parse_channel_id_json(
+    initial_data: dict[str, Any], player_response: dict[str, Any] | None
+) -> ChannelId | None:
+    """Parse the channel id of the video owner."""
+    channel_id = _get(player_response, "videoDetails", "channelId")
+    if channel_id:
+        return ChannelId(channel_id)
+    for item in _watch_contents(initial_data):
+        browse_id = _get(
+            item,
+            "videoSecondaryInfoRenderer",
+            "owner",
+            "videoOwnerRenderer",
+            "navigationEndpoint",
+            "browseEndpoint",
+            "browseId",
+        )
+        if browse_id:
+            return ChannelId(browse_id)
+    return None
+
+
+def parse_yt_page_json(html: HtmlSource, scan: HtmlScan | None = None) -> YtPage:
+    """Parse the watch page from the embedded JSON blobs alone.
+
+    Raises an AssertionError if the blobs are missing or do not describe the
+    page that was rendered, which happens when the page was navigated to
+    within the youtube single page app after the initial load.
+    """
+    scan = scan or HtmlScan(html)
+    initial_data = find_json_paths(
+        html, YT_INITIAL_DATA, WATCH_INITIAL_DATA_PATHS, scan, WATCH_REQUIRED_PATH
+    )
+    assert initial_data is not None, "Could not find ytInitialData."
+    assert (
+        _get(initial_data, *WATCH_REQUIRED_PATH) is not None
+    ), "ytInitialData is not a watch page."
+    player_response = find_json_paths(
+        html, YT_INITIAL_PLAYER_RESPONSE, WATCH_PLAYER_RESPONSE_PATHS, scan
+    )
+    video_id = parse_self_video_id_json(initial_data, player_response)
+    assert video_id is not None, "Could not find video id in ytInitialData."
+    embed_video_id = scan.embed_video_id
+    assert (
+        embed_video_id is None or embed_video_id == video_id
+    ), f"ytInitialData is for {video_id} but the page is for {embed_video_id}."
+    title = parse_title_json(initial_data, player_response)
+    assert title is not None, "Could not find title in ytInitialData."
+    up_next_videos = parse_up_next_videos_json(initial_data)
+    channel_id = parse_channel_id_json(initial_data, player_response)
+    return YtPage(
+        video_id=video_id,
+        title=title,
+        channel_id=channel_id,
+        up_next_videos=up_next_videos,
+    )
+
+
+def _search_items(initial_data: dict[str, Any]) -> list[Any] | None:
+    """The result list of a search page, or the grid of a browse page."""
+    contents = _get(
+        initial_data,
+        "contents",
+        "twoColumnSearchResultsRenderer",
+        "primaryContents",
+        "sectionListRenderer",
+        "contents",
+    )
+    if contents is not None:
+        return contents
+    tabs = _get(initial_data, "contents", "twoColumnBrowseResultsRenderer", "tabs")
+    for tab in tabs or []:
+        grid = _get(tab, "tabRenderer", "content", "richGridRenderer", "contents")
+        if grid is not None:
+            return grid
+    return None
+
+
+def _shelf(item: dict[str, Any]) -> tuple[str | None, list[Any]] | None:
+    """Title and items of a shelf (shorts, "People also watched", ...)."""
+    shelf = item.get("shelfRenderer")
+    if shelf is not None:
+        items = _get(shelf, "content", "verticalListRenderer", "items")
+        if items is None:
+            items = _get(shelf, "content", "horizontalListRenderer", "items")
+        return _runs_text(shelf.get("title")), items or []
+    shelf = item.get("reelShelfRenderer")
+    if shelf is None:
+        shelf = _get(item, "richSectionRenderer", "content", "richShelfRenderer")
+    if shelf is not None:
+        items = shelf.get("items") or shelf.get("contents") or []
+        return _runs_text(shelf.get("title")), items
+    return None
+
+
+def _iter_search_renderers(
+    items: list[Any], shelves: bool, shelf: str | None = None
+) -> Iterator[tuple[str | None, str, dict[str, Any]]]:
+    """(shelf, renderer name, renderer) of each video in page order.
+
+    Ads, channels, playlists and everything else that is not a video are
+    skipped, so are the shelves unless shelves is set.
+    """
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        section = item.get("itemSectionRenderer")
+        if section is not None:
+            yield from _iter_search_renderers(
+                section.get("contents") or [], shelves, shelf
+            )
+            continue
+        content = _get(item, "richItemRenderer", "content") or item
+        for name in ("videoRenderer", "reelItemRenderer"):
+            renderer = content.get(name)
+            # Shorts are only listed by themselves in shelves.
+            if renderer is not None and (name == "videoRenderer" or shelf is not None):
+                yield shelf, name, renderer
+                break
+        else:
+            found = _shelf(item) if shelves else None
+            if found is not None:
+                title, shelf_items = found
+                yield from _iter_search_renderers(shelf_items, shelves, title or "")
+
+
+def _owner_channel_id(owner: Any) -> ChannelId | None:
+    runs = owner.get("runs") if isinstance(owner, dict) else None
+    if not runs:
+        return None
+    browse_id = _get(runs[0], "navigationEndpoint", "browseEndpoint", "browseId")
+    return ChannelId(browse_id) if browse_id else None
+
+
+def _duration_seconds(text: str | None) -> int | None:
+    """Seconds of a "1:02:03" style duration."""
+    if not text:
+        return None
+    seconds = 0
+    for part in text.strip().split(":"):
+        if not part.isdigit():
+            return None
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def _exact_count(text: str | None) -> int | None:
+    if not text:
+        return None
+    match = RE_EXACT_COUNT.match(text.strip())
+    if match is None:
+        return None
+    digits = "".join(char for char in match.group(1) if char.isdigit())
+    return int(digits) if digits else None
+
+
+def _search_result(
+    shelf: str | None, name: str, renderer: dict[str, Any]
+) -> SearchResult | None:
+    video_id = renderer.get("videoId")
+    if not video_id:
+        return None
+    owner = renderer.get("ownerText") or renderer.get("longBylineText")
+    is_live = any(
+        _get(badge, "metadataBadgeRenderer", "style") == "BADGE_STYLE_TYPE_LIVE_NOW"
+        for badge in renderer.get("badges") or []
+    )
+    view_count = None
+    if not is_live:
+        view_count = _exact_count(_runs_text(renderer.get("viewCountText")))
+    return SearchResult(
+        video_id=VideoId(video_id),
+        title=_runs_text(renderer.get("title")) or _runs_text(renderer.get("headline")),
+        channel_id=_owner_channel_id(owner),
+        channel_name=_runs_text(owner),
+        duration_seconds=_duration_seconds(_runs_text(renderer.get("lengthText"))),
+        view_count=view_count,
+        published=_runs_text(renderer.get("publishedTimeText")),
+        is_short=name == "reelItemRenderer"
+        or _get(renderer, "navigationEndpoint", "reelWatchEndpoint") is not None,
+        is_live=is_live,
+        shelf=shelf,
+    )
+
+
+def parse_search_results_json(
+    initial_data: dict[str, Any], shelves: bool = False
+) -> list[SearchResult]:
+    """The video results of a search (or browse) page in the order listed.
+
+    Only the main results are returned unless shelves is set, a video is
+    listed once even if it shows up again further down.
+    """
+    items = _search_items(initial_data)
+    assert items is not None, "Could not find search results in ytInitialData."
+    results: list[SearchResult] = []
+    seen: set[str] = set()
+    for shelf, name, renderer in _iter_search_renderers(items, shelves):
+        result = _search_result(shelf, name, renderer)
+        if result is not None and result.video_id not in seen:
+            seen.add(result.video_id)
+            results.append(result)
+    return results
+
+
+def parse_yt_page_search_json(
+    html: HtmlSource, scan: HtmlScan | None = None, shelves: bool = False
+) -> YtPageSearch:
+    """Parse the search page from ytInitialData, with a record per result."""
+    initial_data = find_json_paths(
+        html, YT_INITIAL_DATA, SEARCH_INITIAL_DATA_PATHS, scan
+    )
+    assert initial_data is not None, "Could not find ytInitialData."
+    results = parse_search_results_json(initial_data, shelves)
+    return YtPageSearch(
+        search_results=[result.video_id for result in results], results=results
+    )
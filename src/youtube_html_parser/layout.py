@@ -0,0 +1,100 @@
+"""
+Page layout fingerprinting, used to skip the up next extractors that can not
+work for a layout and to count which one each layout ends up taking.
+"""
+
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from youtube_html_parser.metrics import is_suppressed
+from youtube_html_parser.scanner import HtmlScan
+
+# Cheap markers, each one is a literal search over the raw html.
+LAYOUT_MARKERS = {
+    "watch_next": "<ytd-watch-next-secondary-results-renderer",
+    "compact_video": "<ytd-compact-video-renderer",
+    "flexy_secondary": 'id="secondary" class="style-scope ytd-watch-flexy"',
+    "rich_grid_row": "<ytd-rich-grid-row",
+}
+
+
+@dataclass(frozen=True)
+class LayoutFingerprint:
+    """Which of the LAYOUT_MARKERS the page contains."""
+
+    watch_next: bool
+    compact_video: bool
+    flexy_secondary: bool
+    rich_grid_row: bool
+
+    def key(self) -> str:
+        present = [name for name in LAYOUT_MARKERS if getattr(self, name)]
+        return "+".join(present) or "none"
+
+
+def classify_layout(scan: HtmlScan) -> LayoutFingerprint:
+    """Fingerprint the layout of the page from the raw html."""
+    return LayoutFingerprint(
+        **{name: scan.find(marker) != -1 for name, marker in LAYOUT_MARKERS.items()}
+    )
+
+
+class StrategyDispatcher:
+    """Runs named extraction strategies in their given order.
+
+    The fingerprint never changes the order, so the result of a page does
+    not depend on the pages parsed before it. Strategies the fingerprint
+    proves can not work are passed as skip. A strategy fails by raising one
+    of the given error types. Counters record how often each path was taken
+    per fingerprint, except inside a metrics.suppressed() block.
+    """
+
+    def __init__(self, errors: tuple[type[BaseException], ...] = (AssertionError,)):
+        self.errors = errors
+        self._lock = threading.Lock()
+        self._taken: Counter[tuple[str, str]] = Counter()
+        self._failed: Counter[tuple[str, str]] = Counter()
+
+    def run(
+        self,
+        fingerprint: str,
+        strategies: dict[str, Callable[[], Any]],
+        skip: Iterable[str] = (),
+    ) -> Any:
+        """Run the strategies until one succeeds, skip names ones known to fail."""
+        skipped = set(skip)
+        errors: list[BaseException] = []
+        for name, strategy in strategies.items():
+            if name in skipped:
+                continue
+            try:
+                out = strategy()
+            except self.errors as e:
+                errors.append(e)
+                if not is_suppressed():
+                    with self._lock:
+                        self._failed[(fingerprint, name)] += 1
+                continue
+            if not is_suppressed():
+                with self._lock:
+                    self._taken[(fingerprint, name)] += 1
+            return out
+        raise AssertionError(f"All strategies failed: {errors}")
+
+    def stats(self) -> dict[str, Any]:
+        """Counters of the path taken and failed attempts per fingerprint."""
+        with self._lock:
+            taken: dict[str, dict[str, int]] = {}
+            for (fingerprint, name), count in self._taken.items():
+                taken.setdefault(fingerprint, {})[name] = count
+            failed: dict[str, dict[str, int]] = {}
+            for (fingerprint, name), count in self._failed.items():
+                failed.setdefault(fingerprint, {})[name] = count
+            return {"taken": taken, "failed": failed}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._taken.clear()
+            self._failed.clear()
@@ -0,0 +1,225 @@
+"""
+Low overhead metrics of the parser, rendered as Prometheus text or JSON.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Iterator
+
+# Set to 1 to record metrics from the start, see MetricsRegistry.enable.
+METRICS_ENV = "YOUTUBE_HTML_PARSER_METRICS"
+PREFIX = "youtube_html_parser_"
+
+SECONDS_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+SIZE_BUCKETS = [2**n * 1024 for n in range(4, 15, 2)]
+
+# name: (type, label name, help, buckets of a histogram)
+METRICS: dict[str, tuple[str, str, str, list[float]]] = {
+    "stage_seconds": (
+        "histogram",
+        "stage",
+        "Time spent in each stage of the parser.",
+        SECONDS_BUCKETS,
+    ),
+    "input_bytes": (
+        "histogram",
+        "kind",
+        "Size of the parsed html in bytes (characters for str input).",
+        SIZE_BUCKETS,
+    ),
+    "fallbacks_total": (
+        "counter",
+        "fallback",
+        "Times a preferred method failed and the parser fell back to another.",
+        [],
+    ),
+    "warnings_total": ("counter", "", "Warnings emitted by the parser.", []),
+}
+
+_DISABLED = nullcontext()
+_LOCAL = threading.local()
+
+
+@contextmanager
+def suppressed() -> Iterator[None]:
+    """Record nothing from this thread inside the block.
+
+    For work that repeats a parse already recorded, like the profiling run
+    of a slow parse.
+    """
+    previous = getattr(_LOCAL, "suppressed", False)
+    _LOCAL.suppressed = True
+    try:
+        yield
+    finally:
+        _LOCAL.suppressed = previous
+
+
+def is_suppressed() -> bool:
+    return getattr(_LOCAL, "suppressed", False)
+
+
+class _Timer:
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry: "MetricsRegistry", stage: str) -> None:
+        self.registry = registry
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        elapsed = time.perf_counter() - self.start
+        self.registry.observe("stage_seconds", elapsed, self.stage)
+
+
+class MetricsRegistry:
+    """Counters and histograms of the METRICS, keyed by their label value.
+
+    Nothing is recorded until the registry is enabled, nor inside a
+    suppressed() block, a disabled registry costs an attribute check per
+    call. Worker processes hand their numbers to the parent with take() and
+    merge().
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[str, float]] = {}
+        # [count per bucket (the last one is +Inf), sum]
+        self._histograms: dict[str, dict[str, list[Any]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled and not getattr(_LOCAL, "suppressed", False)
+
+    def enable(self, enabled: bool = True) -> None:
+        self._enabled = enabled
+
+    def time(self, stage: str) -> ContextManager[None]:
+        """Context manager adding its duration to stage_seconds."""
+        if not self.enabled:
+            return _DISABLED
+        return _Timer(self, stage)
+
+    def inc(self, name: str, label: str = "", amount: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            counter = self._counters.setdefault(name, {})
+            counter[label] = counter.get(label, 0) + amount
+
+    def observe(self, name: str, value: float, label: str = "") -> None:
+        if not self.enabled:
+            return
+        buckets = METRICS[name][3]
+        with self._lock:
+            entry = self._histogram(name, label)
+            entry[0][bisect.bisect_left(buckets, value)] += 1
+            entry[1] += value
+
+    def to_dict(self) -> dict[str, Any]:
+        """Everything recorded so far, as plain json types."""
+        with self._lock:
+            return self._dump()
+
+    def take(self) -> dict[str, Any]:
+        """to_dict() and reset, for a worker to pass its numbers on."""
+        with self._lock:
+            data = self._dump()
+            self._counters.clear()
+            self._histograms.clear()
+        return data
+
+    def merge(self, data: dict[str, Any]) -> None:
+        """Add the numbers of a to_dict() or take(), even when disabled."""
+        with self._lock:
+            for name, values in data.get("counters", {}).items():
+                counter = self._counters.setdefault(name, {})
+                for label, amount in values.items():
+                    counter[label] = counter.get(label, 0) + amount
+            for name, values in data.get("histograms", {}).items():
+                for label, other in values.items():
+                    entry = self._histogram(name, label)
+                    for index, count in enumerate(other["buckets"]):
+                        entry[0][index] += count
+                    entry[1] += other["sum"]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """The Prometheus text exposition format of everything recorded."""
+        data = self.to_dict()
+        lines: list[str] = []
+        for name, (kind, label_name, help_text, buckets) in METRICS.items():
+            full_name = PREFIX + name
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            if kind == "counter":
+                for label, amount in sorted(data["counters"].get(name, {}).items()):
+                    labels = _labels(label_name, label)
+                    lines.append(f"{full_name}{labels} {amount:g}")
+                continue
+            histograms = data["histograms"].get(name, {})
+            lines.extend(_histogram_lines(full_name, label_name, buckets, histograms))
+        return "\n".join(lines) + "\n"
+
+    def _dump(self) -> dict[str, Any]:
+        return {
+            "counters": {name: dict(values) for name, values in self._counters.items()},
+            "histograms": {
+                name: {
+                    label: {"buckets": list(entry[0]), "sum": entry[1]}
+                    for label, entry in values.items()
+                }
+                for name, values in self._histograms.items()
+            },
+        }
+
+    def _histogram(self, name: str, label: str) -> list[Any]:
+        values = self._histograms.setdefault(name, {})
+        entry = values.get(label)
+        if entry is None:
+            entry = [[0] * (len(METRICS[name][3]) + 1), 0.0]
+            values[label] = entry
+        return entry
+
+
+def _histogram_lines(
+    full_name: str,
+    label_name: str,
+    buckets: list[float],
+    histograms: dict[str, dict[str, Any]],
+) -> list[str]:
+    lines: list[str] = []
+    for label, entry in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(buckets + [float("inf")], entry["buckets"]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(
+                f"{full_name}_bucket{_labels(label_name, label, le)} {cumulative}"
+            )
+        labels = _labels(label_name, label)
+        lines.append(f"{full_name}_sum{labels} {entry['sum']:g}")
+        lines.append(f"{full_name}_count{labels} {cumulative}")
+    return lines
+
+
+def _labels(label_name: str, label: str, le: str | None = None) -> str:
+    pairs = [f'{label_name}="{label}"'] if label_name else []
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# The registry the parser records into.
+REGISTRY = MetricsRegistry(enabled=os.environ.get(METRICS_ENV, "") not in ("", "0"))
@@ -0,0 +1,154 @@
+"""
+Packed in memory representation of parse results.
+"""
+
+import base64
+import re
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, overload
+
+from youtube_html_parser.types import ChannelId, VideoId
+from youtube_html_parser.ytpage import YtPage
+from youtube_html_parser.ytpagesearch import SearchResult, YtPageSearch
+
+# A video id is 11 base64url characters, the last one only carries 4 bits so
+# the id is exactly 64 bits.
+RE_PACKABLE_VIDEO_ID = re.compile(r"[A-Za-z0-9_-]{10}[AEIMQUYcgkosw048]")
+
+
+def pack_video_id(video_id: str) -> int | None:
+    """The id as an unsigned 64 bit int, None when it is not a plain video id."""
+    if RE_PACKABLE_VIDEO_ID.fullmatch(video_id) is None:
+        return None
+    return int.from_bytes(base64.urlsafe_b64decode(video_id + "="), "big")
+
+
+def unpack_video_id(value: int) -> VideoId:
+    """Inverse of pack_video_id."""
+    encoded = base64.urlsafe_b64encode(value.to_bytes(8, "big"))
+    return VideoId(encoded[:11].decode("ascii"))
+
+
+class PackedVideoIds(Sequence[VideoId]):
+    """Immutable sequence of video ids stored 8 bytes each in an array.
+
+    Ids that do not pack (the legacy "watch?v=" prefixed ones) are kept as
+    strings on the side. Items come back as VideoId and the sequence compares
+    equal to a list of the same ids.
+    """
+
+    __slots__ = ("_packed", "_unpacked")
+
+    def __init__(self, video_ids: Iterable[str] = ()) -> None:
+        self._packed = array("Q")
+        self._unpacked: dict[int, VideoId] | None = None
+        for index, video_id in enumerate(video_ids):
+            value = pack_video_id(video_id)
+            if value is None:
+                if self._unpacked is None:
+                    self._unpacked = {}
+                self._unpacked[index] = VideoId(video_id)
+                value = 0
+            self._packed.append(value)
+
+    def __len__(self) -> int:
+        return len(self._packed)
+
+    @overload
+    def __getitem__(self, index: int) -> VideoId: ...  # noqa: E704
+
+    @overload
+    def __getitem__(self, index: slice) -> "PackedVideoIds": ...  # noqa: E704
+
+    def __getitem__(self, index: int | slice) -> "VideoId | PackedVideoIds":
+        if isinstance(index, slice):
+            return PackedVideoIds(self[i] for i in range(len(self))[index])
+        if index < 0:
+            index += len(self._packed)
+        if self._unpacked is not None and index in self._unpacked:
+            return self._unpacked[index]
+        return unpack_video_id(self._packed[index])
+
+    def __iter__(self) -> Iterator[VideoId]:
+        for index in range(len(self._packed)):
+            yield self[index]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PackedVideoIds):
+            return self._packed == other._packed and self._unpacked == other._unpacked
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self._packed.tobytes(), tuple((self._unpacked or {}).items())))
+
+    def __repr__(self) -> str:
+        return f"PackedVideoIds({list(self)!r})"
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (PackedVideoIds, (list(self),))
+
+
+@dataclass(frozen=True, slots=True)
+class PackedYtPage:
+    """Memory compact, immutable YtPage for holding many pages at once."""
+
+    video_id: VideoId | None
+    title: str
+    channel_id: ChannelId | None
+    up_next_videos: PackedVideoIds
+
+    @classmethod
+    def from_page(cls, page: YtPage) -> "PackedYtPage":
+        return cls(
+            video_id=page.video_id,
+            title=page.title,
+            channel_id=page.channel_id,
+            up_next_videos=PackedVideoIds(page.up_next_videos),
+        )
+
+    def to_page(self) -> YtPage:
+        """The regular YtPage with the ids as strings."""
+        return YtPage(
+            video_id=self.video_id,
+            title=self.title,
+            channel_id=self.channel_id,
+            up_next_videos=list(self.up_next_videos),
+        )
+
+    def to_dict(self, urls: bool = True) -> dict[str, Any]:
+        return self.to_page().to_dict(urls)
+
+
+@dataclass(frozen=True, slots=True)
+class PackedYtPageSearch:
+    """Memory compact, immutable YtPageSearch."""
+
+    search_results: PackedVideoIds
+    # SearchResult is immutable already, the records are kept as they are.
+    results: tuple[SearchResult, ...] | None = None
+
+    @classmethod
+    def from_page(cls, page: YtPageSearch) -> "PackedYtPageSearch":
+        results = tuple(page.results) if page.results is not None else None
+        return cls(search_results=PackedVideoIds(page.search_results), results=results)
+
+    def to_page(self) -> YtPageSearch:
+        """The regular YtPageSearch with the ids as strings."""
+        results = list(self.results) if self.results is not None else None
+        return YtPageSearch(search_results=list(self.search_results), results=results)
+
+    def to_dict(self, urls: bool = False) -> dict[str, Any]:
+        return self.to_page().to_dict(urls)
+
+
+def pack_page(
+    page: YtPage | YtPageSearch,
+) -> PackedYtPage | PackedYtPageSearch:
+    """Pack a parse result to hold it in memory next to many others."""
+    if isinstance(page, YtPageSearch):
+        return PackedYtPageSearch.from_page(page)
+    return PackedYtPage.from_page(page)
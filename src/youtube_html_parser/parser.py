@@ -1,22 +1,46 @@
-# pylint: disable=too-many-branches
+# pylint: disable=too-many-branches,import-outside-toplevel
 
 import json
 import re
 import warnings
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Callable
 
-# import beautiful soup exceptions
-from bs4 import BeautifulSoup, FeatureNotFound
-
-from youtube_html_parser.types import ChannelId, VideoId
+from youtube_html_parser.cache import ParseCache
+from youtube_html_parser.jsonparse import parse_yt_page_json, parse_yt_page_search_json
+from youtube_html_parser.layout import StrategyDispatcher, classify_layout
+from youtube_html_parser.metrics import REGISTRY
+from youtube_html_parser.profiling import PROFILER
+from youtube_html_parser.scanner import HtmlScan
+from youtube_html_parser.types import ChannelId, HtmlBytes, HtmlSource, VideoId
 from youtube_html_parser.ytpage import YtPage
 from youtube_html_parser.ytpagesearch import YtPageSearch
 
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, Tag
+
+# bs4 is imported by the soup based parsers only, pages taking the json fast
+# path never load it.
+
 RE_PATTERN_WATCHABLE_LINKS = re.compile(r"watch\?v=[\w-]+")
 
+# The only subtrees the soup based parsers look inside of. The
+# player-microformat-renderer and div#secondary live inside ytd-watch-flexy,
+# ytd-rich-grid-row is needed for the circa 2022 up next parser.
+RESTRICTED_SOUP_TAGS = ["title", "ytd-watch-flexy", "ytd-rich-grid-row"]
+
 
-def parse_out_self_video_ids(soup: BeautifulSoup) -> list[VideoId]:
+def _warn(e: BaseException) -> None:
+    REGISTRY.inc("warnings_total")
+    warnings.warn(f"Error: {e}", stacklevel=2)
+
+
+def parse_out_self_video_ids(soup: "BeautifulSoup") -> list[VideoId]:
     """Parse out the video URL from a self post."""
     content_div = soup.find("div", {"id": "content"}, class_="ytd-app")
+    if content_div is None and soup.parse_only is not None:
+        # A restricted soup holds ytd-watch-flexy without its parents.
+        content_div = soup
     assert (
         content_div is not None
     ), "Could not find content div while looking for self video id."
@@ -37,11 +61,53 @@ def parse_out_self_video_ids(soup: BeautifulSoup) -> list[VideoId]:
     return video_ids
 
 
+def parse_out_compact_video_ids(
+    ytd_watch_container: "Tag", verbose=True
+) -> list[VideoId]:
+    """Parse out the video ids of the ytd-compact-video-renderer items."""
+    from bs4 import FeatureNotFound
+
+    video_ids: list[VideoId] = []
+    items = ytd_watch_container.find_all("ytd-compact-video-renderer")
+    assert items is not None, "Could not find items."
+    for item in items:
+        try:
+            a_tag = item.find("a", {"id": "thumbnail"})
+            assert a_tag is not None, "Could not find a tag."
+            href = a_tag["href"]
+            video_id = href.split("&")[0].split("=")[-1]
+            if video_id is not None:
+                video_ids.append(VideoId(video_id))
+        except AssertionError as e:
+            if verbose:
+                _warn(e)
+            raise e
+        except FeatureNotFound as e:
+            if verbose:
+                _warn(e)
+        except KeyError as e:
+            if verbose:
+                _warn(e)
+        except AttributeError as e:
+            if verbose:
+                _warn(e)
+        except KeyboardInterrupt:
+            break
+        except SystemExit:
+            break
+        except Exception as e:  # pylint: disable=broad-except
+            if verbose:
+                _warn(e)
+    return video_ids
+
+
 def parse_out_up_next_videos_subtype1(
-    soup: BeautifulSoup, verbose=True
+    soup: "BeautifulSoup", verbose=True
 ) -> list[VideoId]:
     """Parse out the video URL from the up next videos."""
     # This parser was known to work with modern videos.
+    from bs4 import FeatureNotFound
+
     video_ids: list[VideoId] = []
     try:
         secondary_div = soup.find(
@@ -56,49 +122,20 @@ def parse_out_up_next_videos_subtype1(
             "ytd-watch-next-secondary-results-renderer"
         )
         assert ytd_watch_container is not None, "Could not find watch next container."
-        items = ytd_watch_container.find_all("ytd-compact-video-renderer")
-        assert items is not None, "Could not find items."
-        for item in items:
-            try:
-                a_tag = item.find("a", {"id": "thumbnail"})
-                assert a_tag is not None, "Could not find a tag."
-                href = a_tag["href"]
-                video_id = href.split("&")[0].split("=")[-1]
-                if video_id is not None:
-                    video_ids.append(VideoId(video_id))
-            except AssertionError as e:
-                if verbose:
-                    warnings.warn(f"Error: {e}")
-                raise e
-            except FeatureNotFound as e:
-                if verbose:
-                    warnings.warn(f"Error: {e}")
-            except KeyError as e:
-                if verbose:
-                    warnings.warn(f"Error: {e}")
-            except AttributeError as e:
-                if verbose:
-                    warnings.warn(f"Error: {e}")
-            except KeyboardInterrupt:
-                break
-            except SystemExit:
-                break
-            except Exception as e:  # pylint: disable=broad-except
-                if verbose:
-                    warnings.warn(f"Error: {e}")
+        video_ids = parse_out_compact_video_ids(ytd_watch_container, verbose=verbose)
     except AssertionError as e:
         if verbose:
-            warnings.warn(f"Error: {e}")
+            _warn(e)
         raise e
     except FeatureNotFound as e:  # pylint: disable=broad-except
         if verbose:
-            warnings.warn(f"Error: {e}")
+            _warn(e)
     except AttributeError as e:
         if verbose:
-            warnings.warn(f"Error: {e}")
+            _warn(e)
     except KeyError as e:
         if verbose:
-            warnings.warn(f"Error: {e}")
+            _warn(e)
     except KeyboardInterrupt:
         pass
     except SystemExit:
@@ -108,7 +145,7 @@ def parse_out_up_next_videos_subtype1(
 
 
 def parse_out_up_next_videos_subtype2(
-    soup: BeautifulSoup, verbose=True
+    soup: "BeautifulSoup", verbose=True
 ) -> list[VideoId]:
     """Used for older videos circa 2022"""
     video_ids: list[VideoId] = []
@@ -130,7 +167,7 @@ def parse_out_up_next_videos_subtype2(
         return video_ids
     except AssertionError as e:
         if verbose:
-            warnings.warn(f"Error: {e}")
+            _warn(e)
         raise e
 
 
@@ -145,45 +182,75 @@ def unique_video_ids(video_ids: list[VideoId]) -> list[VideoId]:
     return unique_video_ids_out
 
 
-def parse_out_up_next_videos(soup: BeautifulSoup, html: str) -> list[VideoId]:
-    """Parse out the video URL from the up next videos using different methods."""
-    parsers = [
-        lambda: parse_out_up_next_videos_subtype1(soup, verbose=False),
-        lambda: parse_out_up_next_videos_subtype2(soup, verbose=False),
-        lambda: parse_all_watchable_links(html),  # last resort
-    ]
-    errors = []
-    for parser in parsers:
-        try:
-            out = parser()
-            out = unique_video_ids(out)
-            return out
-        except AssertionError as e:
-            errors.append(e)
-        except FeatureNotFound as e:
-            errors.append(e)
-    raise AssertionError(f"Could not parse up next videos: {errors}")
+# FeatureNotFound is raised while building the soup, before any strategy runs,
+# and the soup strategies catch it themselves.
+UP_NEXT_DISPATCHER = StrategyDispatcher(errors=(AssertionError,))
+
+
+def parse_out_up_next_videos(
+    soup: "BeautifulSoup", html: HtmlSource, scan: HtmlScan | None = None
+) -> list[VideoId]:
+    """Parse out the video URL from the up next videos using different methods.
 
+    The layout of the page is fingerprinted first to skip the methods that
+    can not work for it, see up_next_stats.
+    """
+    scan = scan or HtmlScan(html)
+    parsers = {
+        "subtype1": lambda: parse_out_up_next_videos_subtype1(soup, verbose=False),
+        "subtype2": lambda: parse_out_up_next_videos_subtype2(soup, verbose=False),
+        "watchable_links": lambda: parse_all_watchable_links(html, scan),
+    }
+    if REGISTRY.enabled:
+        parsers = {name: _timed_strategy(name, func) for name, func in parsers.items()}
+    layout = classify_layout(scan)
+    # subtype1 can not succeed without the watch next container.
+    skip = [] if layout.watch_next else ["subtype1"]
+    try:
+        out = UP_NEXT_DISPATCHER.run(layout.key(), parsers, skip=skip)
+    except AssertionError as e:
+        raise AssertionError(f"Could not parse up next videos: {e}")
+    return unique_video_ids(out)
 
-def parse_channel_url(html: str) -> ChannelId | None:
+
+def _timed_strategy(
+    name: str, func: Callable[[], list[VideoId]]
+) -> Callable[[], list[VideoId]]:
+    """Time an up next strategy and count its failures as fallbacks."""
+
+    def run() -> list[VideoId]:
+        with REGISTRY.time(f"up_next_{name}"):
+            try:
+                return func()
+            except UP_NEXT_DISPATCHER.errors:
+                REGISTRY.inc("fallbacks_total", f"up_next_{name}")
+                raise
+
+    return run
+
+
+def up_next_stats() -> dict[str, Any]:
+    """How often each up next method was taken, per layout fingerprint."""
+    return UP_NEXT_DISPATCHER.stats()
+
+
+def parse_channel_url(
+    html: HtmlSource, scan: HtmlScan | None = None
+) -> ChannelId | None:
     """Parse the channel URL."""
-    # href="/channel/UCu2uabLB7WHhkhdcLV5BcZg/videos"
-    match = re.search(r'href="/channel/([^/]+)/about"', html)
-    if match:
-        out: str = str(match.group(1))
-        return ChannelId(out)
-    return None
+    # href="/channel/UCu2uabLB7WHhkhdcLV5BcZg/about"
+    scan = scan or HtmlScan(html)
+    return scan.channel_id
 
 
-def parse_channel_id2(html: str) -> ChannelId | None:
-    match = re.search(r'/channel/([^/">\b]+)/about"', html)
-    if match:
-        out: str = str(match.group(1))
-        return ChannelId(out)
-    return None
+def parse_channel_id2(
+    html: HtmlSource, scan: HtmlScan | None = None
+) -> ChannelId | None:
+    scan = scan or HtmlScan(html)
+    return scan.channel_id_loose
 
 
-def parse_title(soup: BeautifulSoup) -> str:
+def parse_title(soup: "BeautifulSoup") -> str:
     """Parse the title of the video."""
     try:
         title_div = soup.find("player-microformat-renderer")
@@ -198,71 +265,291 @@ def parse_title(soup: BeautifulSoup) -> str:
     except AssertionError:
         # could not find the title from the json, therefore try to find the title
         # from the <title> tag and remove the " - YouTube" from the end.
+        REGISTRY.inc("fallbacks_total", "title_tag")
         title = soup.title.string
         assert title is not None, "Could not find title."
         return title.replace(" - YouTube", "")
     except AttributeError as e:
-        warnings.warn(f"Error: {e}")
+        _warn(e)
         raise e
 
 
-def create_soup(html: str) -> BeautifulSoup:
-    """Create a soup object."""
-    return BeautifulSoup(html, "lxml")
+def create_soup(html: HtmlSource, restricted: bool = False) -> "BeautifulSoup":
+    """Create a soup object.
 
+    When restricted is set only the RESTRICTED_SOUP_TAGS subtrees are turned
+    into soup objects, everything else is skipped while parsing. Raw bytes
+    are handed to lxml which decodes them as utf-8.
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
 
-def parse_yt_page(html: str) -> YtPage:
-    """Parse the YouTube page."""
-    soup = create_soup(html)
-    title: str | None = None
-    try:
-        title = parse_title(soup)
-    except AssertionError as e:
-        warnings.warn(f"Error: {e}")
-        title = "Unknown title."
-    try:
-        video_ids = parse_out_self_video_ids(soup)
-    except AssertionError as e:
-        warnings.warn(f"Error: {e}")
-        video_ids = []
-    try:
-        up_next_video_ids = parse_out_up_next_videos(soup, html)
-    except AssertionError as e:
-        warnings.warn(f"Error: {e}")
-        raise
-    channel_id = parse_channel_url(html)
+    kwargs: dict[str, Any] = {}
+    if not isinstance(html, str):
+        if not isinstance(html, bytes):
+            html = bytes(html)
+        kwargs["from_encoding"] = "utf-8"
+    if restricted:
+        kwargs["parse_only"] = SoupStrainer(RESTRICTED_SOUP_TAGS)
+    with REGISTRY.time("soup"):
+        return BeautifulSoup(html, "lxml", **kwargs)
+
+
+def parse_yt_page(
+    html: str,
+    json_fast_path: bool = True,
+    restricted_soup: bool = True,
+    cache: ParseCache | None = None,
+) -> YtPage:
+    """Parse the YouTube page.
+
+    When json_fast_path is set the page is first parsed from the embedded
+    ytInitialData / ytInitialPlayerResponse blobs, the soup is only built
+    when those are missing or stale. The soup is restricted to the subtrees
+    the parsers need unless restricted_soup is False. With a cache a page
+    that was parsed before is returned without parsing it again.
+    """
+    return _parse_yt_page_cached(html, json_fast_path, restricted_soup, cache)
+
+
+def parse_yt_page_bytes(
+    data: HtmlBytes,
+    json_fast_path: bool = True,
+    restricted_soup: bool = True,
+    cache: ParseCache | None = None,
+) -> YtPage:
+    """Parse the YouTube page from undecoded utf-8 bytes, a memoryview or an mmap.
+
+    Only the fragments that end up in the result are decoded, see
+    parse_yt_page for the options.
+    """
+    return _parse_yt_page_cached(data, json_fast_path, restricted_soup, cache)
+
+
+def _parse_yt_page_cached(
+    html: HtmlSource,
+    json_fast_path: bool,
+    restricted_soup: bool,
+    cache: ParseCache | None,
+) -> YtPage:
+    if cache is None:
+        return _parse_yt_page(html, json_fast_path, restricted_soup)
+    # The DOM path can give a different up next list, so it is keyed apart.
+    kind = "page" if json_fast_path else "page-dom"
+    return cache.parse(
+        html, kind, lambda: _parse_yt_page(html, json_fast_path, restricted_soup)
+    )
+
+
+def _parse_yt_page(
+    html: HtmlSource, json_fast_path: bool, restricted_soup: bool
+) -> YtPage:
+    REGISTRY.observe("input_bytes", len(html), "page")
+    with REGISTRY.time("total"):
+        return PROFILER.run(
+            "page",
+            html,
+            lambda: _parse_yt_page_stages(html, json_fast_path, restricted_soup),
+        )
+
+
+def _parse_yt_page_stages(
+    html: HtmlSource, json_fast_path: bool, restricted_soup: bool
+) -> YtPage:
+    scan = HtmlScan(html)
+    if json_fast_path:
+        json_page = _parse_json_or_none(html, scan)
+        if json_page is not None:
+            return json_page
+    soup = create_soup(html, restricted=restricted_soup)
+    title = _parse_title_or_unknown(soup)
+    video_id = _parse_self_video_id(soup)
+    up_next_video_ids = _parse_up_next_videos_or_raise(soup, html, scan)
+    with REGISTRY.time("channel"):
+        channel_id = parse_channel_url(html, scan)
     return YtPage(
-        video_id=video_ids[0] if video_ids else None,
+        video_id=video_id,
         title=title,
         channel_id=channel_id,
         up_next_videos=up_next_video_ids,
     )
 
 
-def parse_all_watchable_links(html: str) -> list[VideoId]:
+def _parse_json_or_none(html: HtmlSource, scan: HtmlScan) -> YtPage | None:
+    with REGISTRY.time("json"):
+        try:
+            return parse_yt_page_json(html, scan)
+        except AssertionError:
+            REGISTRY.inc("fallbacks_total", "json_to_soup")
+            return None
+
+
+def _parse_title_or_unknown(soup: "BeautifulSoup") -> str:
+    with REGISTRY.time("title"):
+        try:
+            return parse_title(soup)
+        except AssertionError as e:
+            REGISTRY.inc("fallbacks_total", "title_unknown")
+            _warn(e)
+            return "Unknown title."
+
+
+def _parse_self_video_id(soup: "BeautifulSoup") -> VideoId | None:
+    with REGISTRY.time("self_video_ids"):
+        try:
+            video_ids = parse_out_self_video_ids(soup)
+        except AssertionError as e:
+            _warn(e)
+            video_ids = []
+    return video_ids[0] if video_ids else None
+
+
+def _parse_up_next_videos_or_raise(
+    soup: "BeautifulSoup", html: HtmlSource, scan: HtmlScan
+) -> list[VideoId]:
+    with REGISTRY.time("up_next"):
+        try:
+            return parse_out_up_next_videos(soup, html, scan)
+        except AssertionError as e:
+            _warn(e)
+            raise
+
+
+class LazyYtPage(YtPage):
+    """A YtPage whose fields are only parsed when first accessed.
+
+    Each field is computed once and memoised, a caller that only reads
+    channel_id never builds a soup. The results are the same as
+    parse_yt_page, including the AssertionError for unparsable up next
+    videos which is raised on access instead. The html (or mmap) must stay
+    valid until the fields have been read.
+    """
+
+    def __init__(  # pylint: disable=super-init-not-called
+        self,
+        html: HtmlSource,
+        json_fast_path: bool = True,
+        restricted_soup: bool = True,
+    ) -> None:
+        # YtPage.__init__ is skipped, the fields are cached properties below.
+        self._html = html
+        self._json_fast_path = json_fast_path
+        self._restricted_soup = restricted_soup
+
+    @cached_property
+    def _scan(self) -> HtmlScan:
+        return HtmlScan(self._html)
+
+    @cached_property
+    def _json_page(self) -> YtPage | None:
+        if not self._json_fast_path:
+            return None
+        return _parse_json_or_none(self._html, self._scan)
+
+    @cached_property
+    def _soup(self) -> "BeautifulSoup":
+        return create_soup(self._html, restricted=self._restricted_soup)
+
+    @cached_property
+    def video_id(self) -> VideoId | None:  # type: ignore[override]
+        if self._json_page is not None:
+            return self._json_page.video_id
+        return _parse_self_video_id(self._soup)
+
+    @cached_property
+    def title(self) -> str:  # type: ignore[override]
+        if self._json_page is not None:
+            return self._json_page.title
+        return _parse_title_or_unknown(self._soup)
+
+    @cached_property
+    def channel_id(self) -> ChannelId | None:  # type: ignore[override]
+        if self._json_page is not None:
+            return self._json_page.channel_id
+        with REGISTRY.time("channel"):
+            return parse_channel_url(self._html, self._scan)
+
+    @cached_property
+    def up_next_videos(self) -> list[VideoId]:  # type: ignore[override]
+        if self._json_page is not None:
+            return self._json_page.up_next_videos
+        return _parse_up_next_videos_or_raise(self._soup, self._html, self._scan)
+
+    def to_page(self) -> YtPage:
+        """Compute every field and return an eager YtPage."""
+        return YtPage(
+            video_id=self.video_id,
+            title=self.title,
+            channel_id=self.channel_id,
+            up_next_videos=self.up_next_videos,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        """Equal to any YtPage, lazy or not, with the same fields."""
+        if not isinstance(other, YtPage):
+            return NotImplemented
+        return (
+            self.video_id,
+            self.title,
+            self.channel_id,
+            self.up_next_videos,
+        ) == (other.video_id, other.title, other.channel_id, other.up_next_videos)
+
+
+def parse_yt_page_lazy(
+    html: HtmlSource, json_fast_path: bool = True, restricted_soup: bool = True
+) -> LazyYtPage:
+    """Like parse_yt_page but every field is parsed on first access."""
+    return LazyYtPage(html, json_fast_path, restricted_soup)
+
+
+def parse_all_watchable_links(
+    html: HtmlSource, scan: HtmlScan | None = None
+) -> list[VideoId]:
     """Parse out all the hrefs from the HTML."""
-    # parse out all the hrefs of the vorm watch?v=VIDEO_ID
-    hrefs = re.findall(RE_PATTERN_WATCHABLE_LINKS, html)
-    href_set = set([])
-    hrefs_out = []
-    for href in hrefs:
-        if href not in href_set:
-            href_set.add(href)
-            hrefs_out.append(href)
-
-    # now remove all watch?v= from the hrefs
-    hrefs_out = [href.replace("watch?v=", "") for href in hrefs_out]
-    # make unique
-    hrefs_set = set([])
-    unique_href_out = []
-    for href in hrefs_out:
-        if href not in hrefs_set:
-            hrefs_set.add(href)
-            unique_href_out.append(href)
-    return [VideoId(video_id) for video_id in unique_href_out]
-
-
-def parse_yt_page_seach(html: str) -> YtPageSearch:
-    """Parse the YouTube page."""
-    video_ids = parse_all_watchable_links(html)
-    return YtPageSearch(search_results=[VideoId(video_id) for video_id in video_ids])
+    # parse out all the unique ids of the form watch?v=VIDEO_ID
+    scan = scan or HtmlScan(html)
+    return list(scan.watch_ids)
+
+
+def parse_yt_page_seach(
+    html: str, cache: ParseCache | None = None, rich: bool = False
+) -> YtPageSearch:
+    """Parse the YouTube page.
+
+    Without rich the results are the ids of every watch link on the page.
+    With rich they are read from ytInitialData in the order listed, with a
+    SearchResult record each and without ads and shelves. Pages without
+    ytInitialData fall back to the watch links.
+    """
+    if cache is not None:
+        kind = "search-rich" if rich else "search"
+        return cache.parse(html, kind, lambda: parse_yt_page_seach(html, rich=rich))
+    return _parse_search(html, rich)
+
+
+def parse_yt_page_seach_bytes(
+    data: HtmlBytes, cache: ParseCache | None = None, rich: bool = False
+) -> YtPageSearch:
+    """Parse the YouTube search page from undecoded utf-8 bytes."""
+    if cache is not None:
+        kind = "search-rich" if rich else "search"
+        return cache.parse(
+            data, kind, lambda: parse_yt_page_seach_bytes(data, rich=rich)
+        )
+    return _parse_search(data, rich)
+
+
+def _parse_search(html: HtmlSource, rich: bool) -> YtPageSearch:
+    REGISTRY.observe("input_bytes", len(html), "search")
+    with REGISTRY.time("search"):
+        return PROFILER.run("search", html, lambda: _parse_search_stages(html, rich))
+
+
+def _parse_search_stages(html: HtmlSource, rich: bool) -> YtPageSearch:
+    scan = HtmlScan(html)
+    if rich:
+        try:
+            return parse_yt_page_search_json(html, scan)
+        except AssertionError:
+            REGISTRY.inc("fallbacks_total", "search_links")
+    return YtPageSearch(search_results=parse_all_watchable_links(html, scan))
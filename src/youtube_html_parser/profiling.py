@@ -0,0 +1,210 @@
+"""
+Sampled cProfile and tracemalloc captures of parses, saved with their input.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import warnings
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Iterator, TypeVar
+
+from youtube_html_parser.cache import PARSER_VERSION, html_digest
+from youtube_html_parser.metrics import suppressed
+from youtube_html_parser.types import HtmlSource
+
+# Setting the directory enables profiling, the others tune it like the CLI
+# flags of the same name.
+PROFILE_DIR_ENV = "YOUTUBE_HTML_PARSER_PROFILE_DIR"
+PROFILE_EVERY_ENV = "YOUTUBE_HTML_PARSER_PROFILE_EVERY"
+PROFILE_THRESHOLD_ENV = "YOUTUBE_HTML_PARSER_PROFILE_THRESHOLD_MS"
+PROFILE_MEMORY_ENV = "YOUTUBE_HTML_PARSER_PROFILE_MEMORY"
+
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class ProfileConfig:
+    """Profile every Nth parse and the ones slower than threshold_ms."""
+
+    directory: str
+    every: int = 0
+    threshold_ms: float | None = None
+    memory: bool = False
+
+
+def profile_config(
+    directory: str | Path,
+    every: int | None = None,
+    threshold_ms: float | None = None,
+    memory: bool = False,
+) -> ProfileConfig:
+    """Without every or threshold_ms every parse is profiled."""
+    if every is None:
+        every = 0 if threshold_ms is not None else 1
+    return ProfileConfig(str(directory), every, threshold_ms, memory)
+
+
+def profile_config_from_env() -> ProfileConfig | None:
+    directory = os.environ.get(PROFILE_DIR_ENV)
+    if not directory:
+        return None
+    every = os.environ.get(PROFILE_EVERY_ENV)
+    threshold_ms = os.environ.get(PROFILE_THRESHOLD_ENV)
+    return profile_config(
+        directory,
+        every=int(every) if every else None,
+        threshold_ms=float(threshold_ms) if threshold_ms else None,
+        memory=os.environ.get(PROFILE_MEMORY_ENV, "") not in ("", "0"),
+    )
+
+
+class Profiler:
+    """Decides which parses to profile and writes the captures.
+
+    A sampled or forced parse runs under cProfile (and tracemalloc with
+    memory set). A parse slower than threshold_ms is parsed a second time
+    under the profiler, which keeps fast parses free of its overhead, with
+    metrics suppressed so it is not recorded twice. Each
+    capture is a directory with the input html, the pstats dump, a text
+    summary and meta.json.
+    """
+
+    def __init__(self, config: ProfileConfig | None = None) -> None:
+        self.config = config
+        self._lock = threading.Lock()
+        self._count = 0
+        self._local = threading.local()
+
+    def configure(self, config: ProfileConfig | None) -> None:
+        with self._lock:
+            self.config = config
+            self._count = 0
+
+    @contextmanager
+    def forced(self) -> Iterator[None]:
+        """Profile the parses of this thread inside the block."""
+        self._local.forced = True
+        try:
+            yield
+        finally:
+            self._local.forced = False
+
+    def run(self, kind: str, html: HtmlSource, parse: Callable[[], T]) -> T:
+        """Call parse, profiling it when it is due."""
+        config = self.config
+        if config is None:
+            return parse()
+        with self._lock:
+            self._count += 1
+            sampled = config.every > 0 and self._count % config.every == 0
+        if getattr(self._local, "forced", False):
+            return self._capture(config, kind, html, parse, "forced")
+        if sampled:
+            return self._capture(config, kind, html, parse, "sampled")
+        if config.threshold_ms is None:
+            return parse()
+        start = time.perf_counter()
+        try:
+            return parse()
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms >= config.threshold_ms:
+                try:
+                    with suppressed():
+                        self._capture(config, kind, html, parse, "slow", elapsed_ms)
+                except Exception:  # pylint: disable=broad-except
+                    pass
+
+    def _capture(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        config: ProfileConfig,
+        kind: str,
+        html: HtmlSource,
+        parse: Callable[[], T],
+        reason: str,
+        first_ms: float | None = None,
+    ) -> T:
+        profile = cProfile.Profile()
+        # Leave a tracer started by someone else (bench, another capture) on.
+        own_tracing = config.memory and not tracemalloc.is_tracing()
+        if own_tracing:
+            tracemalloc.start()
+        error = None
+        start = time.perf_counter()
+        try:
+            profile.enable()
+            try:
+                return parse()
+            finally:
+                profile.disable()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            snapshot = None
+            if config.memory and tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+            if own_tracing:
+                tracemalloc.stop()
+            meta = {
+                "kind": kind,
+                "reason": reason,
+                "elapsed_ms": first_ms if first_ms is not None else elapsed_ms,
+                "profiled_ms": elapsed_ms,
+                "error": error,
+                "parser_version": PARSER_VERSION,
+                "config": asdict(config),
+            }
+            try:
+                write_capture(Path(config.directory), html, profile, snapshot, meta)
+            except OSError as e:
+                warnings.warn(f"Could not write the profile: {e}")
+
+
+def write_capture(
+    directory: Path,
+    html: HtmlSource,
+    profile: cProfile.Profile,
+    snapshot: tracemalloc.Snapshot | None,
+    meta: dict,
+) -> Path:
+    """Write one capture to a new subdirectory, returns it."""
+    data = html.encode("utf-8") if isinstance(html, str) else bytes(html)
+    name = "-".join(
+        [
+            time.strftime("%Y%m%d-%H%M%S"),
+            meta["kind"],
+            meta["reason"],
+            html_digest(data, meta["kind"])[:12],
+            str(os.getpid()),
+        ]
+    )
+    out = directory / name
+    out.mkdir(parents=True, exist_ok=True)
+    (out / "input.html").write_bytes(data)
+    profile.dump_stats(str(out / "profile.pstats"))
+    summary = io.StringIO()
+    stats = pstats.Stats(profile, stream=summary)
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    (out / "profile.txt").write_text(summary.getvalue(), encoding="utf-8")
+    if snapshot is not None:
+        lines = [str(stat) for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]]
+        (out / "tracemalloc.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    (out / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return out
+
+
+# The profiler of the parse entry points, set up from the environment.
+PROFILER = Profiler(profile_config_from_env())
@@ -0,0 +1,161 @@
+"""
+Shared scan of the raw HTML for the anchors the regex based extractors need.
+"""
+
+import re
+from functools import cached_property
+from typing import Any
+
+from youtube_html_parser.types import ChannelId, HtmlSource, VideoId
+
+_WATCH_ID = r"watch\?v=([\w-]+)"
+_CHANNEL_ABOUT = r'/channel/([^/]+)/about"'
+_JSON_BLOB = r'(ytInitial(?:Data|PlayerResponse))(?:"\])? = (?=\{)'
+_EMBED_URL = r'"embedUrl": ?"([^"]*)"'
+_SCRIPT_CLOSE = r"</script"
+
+RE_WATCH_ID = re.compile(_WATCH_ID)
+RE_CHANNEL_ABOUT = re.compile(_CHANNEL_ABOUT)
+RE_JSON_BLOB = re.compile(_JSON_BLOB)
+RE_EMBED_URL = re.compile(_EMBED_URL)
+RE_SCRIPT_CLOSE = re.compile(_SCRIPT_CLOSE)
+
+RE_WATCH_ID_BYTES = re.compile(_WATCH_ID.encode())
+RE_CHANNEL_ABOUT_BYTES = re.compile(_CHANNEL_ABOUT.encode())
+RE_JSON_BLOB_BYTES = re.compile(_JSON_BLOB.encode())
+RE_EMBED_URL_BYTES = re.compile(_EMBED_URL.encode())
+RE_SCRIPT_CLOSE_BYTES = re.compile(_SCRIPT_CLOSE.encode())
+
+JSON_BLOB_PREFIXES = ("var ", 'window["', "window.")
+
+_UNCLEAN_CHANNEL_CHARS = frozenset('">\b')
+
+_LITERAL_CACHE: dict[str, tuple[re.Pattern[str], re.Pattern[bytes]]] = {}
+
+
+class HtmlScan:
+    """Anchors found in the raw HTML, each kind is found with one sweep.
+
+    Every anchor kind is led by a literal so the regex engine can skip
+    ahead quickly, a single alternation of all of them is several times
+    slower per byte in the re module. Each sweep runs on first use and
+    is shared by every extractor handed the same scan.
+
+    The html may be a str or any bytes-like object (bytes, memoryview,
+    mmap). Bytes are scanned as is and only the matched fragments are
+    decoded.
+    """
+
+    def __init__(self, html: HtmlSource) -> None:
+        self.html = html
+        self.is_text = isinstance(html, str)
+        text = self.is_text
+        self._re_watch_id: re.Pattern[Any] = RE_WATCH_ID if text else RE_WATCH_ID_BYTES
+        self._re_channel_about: re.Pattern[Any] = (
+            RE_CHANNEL_ABOUT if text else RE_CHANNEL_ABOUT_BYTES
+        )
+        self._re_json_blob: re.Pattern[Any] = (
+            RE_JSON_BLOB if text else RE_JSON_BLOB_BYTES
+        )
+        self._re_embed_url: re.Pattern[Any] = (
+            RE_EMBED_URL if text else RE_EMBED_URL_BYTES
+        )
+        self._re_script_close: re.Pattern[Any] = (
+            RE_SCRIPT_CLOSE if text else RE_SCRIPT_CLOSE_BYTES
+        )
+
+    def _str(self, fragment: str | bytes) -> str:
+        if isinstance(fragment, str):
+            return fragment
+        return fragment.decode("utf-8", errors="replace")
+
+    def _has_prefix(self, prefix: str, end: int) -> bool:
+        start = end - len(prefix)
+        if start < 0:
+            return False
+        if isinstance(self.html, str):
+            return self.html[start:end] == prefix
+        return bytes(self.html[start:end]) == prefix.encode()
+
+    def text(self, start: int, end: int) -> str:
+        """Decode the html between start and end."""
+        if isinstance(self.html, str):
+            return self.html[start:end]
+        with memoryview(self.html) as view, view[start:end] as fragment:
+            return str(fragment, "utf-8")
+
+    def find(self, literal: str, start: int = 0) -> int:
+        """Offset of the first occurrence of literal, or -1."""
+        patterns = _LITERAL_CACHE.get(literal)
+        if patterns is None:
+            escaped = re.escape(literal)
+            patterns = (re.compile(escaped), re.compile(escaped.encode()))
+            _LITERAL_CACHE[literal] = patterns
+        pattern: re.Pattern[Any] = patterns[0] if self.is_text else patterns[1]
+        match = pattern.search(self.html, start)
+        return match.start() if match else -1
+
+    def script_end(self, start: int) -> int:
+        """Offset of the </script> closing the script that start is inside."""
+        match = self._re_script_close.search(self.html, start)
+        return match.start() if match else len(self.html)
+
+    @cached_property
+    def watch_ids(self) -> list[VideoId]:
+        """Unique ids of every watch?v= link, in document order."""
+        seen: set[str] = set()
+        out: list[VideoId] = []
+        for fragment in self._re_watch_id.findall(self.html):
+            video_id = self._str(fragment)
+            if video_id not in seen:
+                seen.add(video_id)
+                out.append(VideoId(video_id))
+        return out
+
+    @cached_property
+    def _channel_about_ids(self) -> tuple[ChannelId | None, ChannelId | None]:
+        href_id: ChannelId | None = None
+        clean_id: ChannelId | None = None
+        for match in self._re_channel_about.finditer(self.html):
+            channel = self._str(match.group(1))
+            if href_id is None and self._has_prefix('href="', match.start()):
+                href_id = ChannelId(channel)
+            if clean_id is None and not _UNCLEAN_CHANNEL_CHARS.intersection(channel):
+                clean_id = ChannelId(channel)
+            if href_id is not None and clean_id is not None:
+                break
+        return href_id, clean_id
+
+    @property
+    def channel_id(self) -> ChannelId | None:
+        """The first href="/channel/<id>/about" link."""
+        return self._channel_about_ids[0]
+
+    @property
+    def channel_id_loose(self) -> ChannelId | None:
+        """The first /channel/<id>/about" link, even outside of an href."""
+        return self._channel_about_ids[1]
+
+    @cached_property
+    def embed_video_id(self) -> VideoId | None:
+        """The video id of the first ld+json embedUrl."""
+        match = self._re_embed_url.search(self.html)
+        if match is None:
+            return None
+        embed_url = self._str(match.group(1))
+        return VideoId(embed_url.split("/")[-1].split("?")[0])
+
+    @cached_property
+    def json_blob_offsets(self) -> dict[str, int]:
+        """Offset of the opening brace of the first assignment of each blob."""
+        offsets: dict[str, int] = {}
+        for match in self._re_json_blob.finditer(self.html):
+            start = match.start()
+            if not any(
+                self._has_prefix(prefix, start) for prefix in JSON_BLOB_PREFIXES
+            ):
+                continue
+            offsets.setdefault(self._str(match.group(1)), match.end())
+            if len(offsets) == 2:
+                break
+        return offsets
@@ -0,0 +1,49 @@
+"""
+Compact JSON output of parse results, NDJSON streaming and the fast encoder.
+"""
+
+import json
+from pathlib import Path
+from typing import IO, Any, Protocol
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+
+class Serializable(Protocol):  # pylint: disable=too-few-public-methods
+    def to_dict(self, urls: bool = ...) -> dict[str, Any]:
+        """The object as a JSON compatible dict."""
+
+
+def dumps_compact(obj: Any) -> bytes:
+    """Encode as utf-8 JSON without whitespace, with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)  # pylint: disable=no-member
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def write_json(outfile: Path, obj: dict[str, Any], compact: bool = False) -> None:
+    """Write to a file, streamed to the handle instead of built as one string."""
+    if compact:
+        outfile.write_bytes(dumps_compact(obj))
+        return
+    with open(outfile, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2)
+
+
+class NdjsonWriter:
+    """Appends one compact JSON object per line to a binary file handle."""
+
+    def __init__(self, out: IO[bytes], urls: bool = False) -> None:
+        self.out = out
+        self.urls = urls
+        self.count = 0
+
+    def write(self, page: Serializable) -> None:
+        self.write_dict(page.to_dict(urls=self.urls))
+
+    def write_dict(self, obj: dict[str, Any]) -> None:
+        self.out.write(dumps_compact(obj) + b"\n")
+        self.count += 1
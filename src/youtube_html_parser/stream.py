@@ -0,0 +1,186 @@
+"""
+Incremental parsing of a watch page while it is still downloading.
+"""
+
+import dataclasses
+import re
+import warnings
+from typing import Any
+
+from youtube_html_parser.jsonparse import parse_yt_page_json
+from youtube_html_parser.parser import (
+    create_soup,
+    parse_out_compact_video_ids,
+    parse_title,
+    parse_yt_page_bytes,
+    unique_video_ids,
+)
+from youtube_html_parser.scanner import RE_CHANNEL_ABOUT_BYTES, RE_EMBED_URL_BYTES
+from youtube_html_parser.types import ChannelId, VideoId
+from youtube_html_parser.ytpage import YtPage
+
+# Anchors that straddle two chunks are found by rescanning this many bytes.
+OVERLAP = 1024
+
+RE_WATCH_FLEXY_OPEN = re.compile(rb"<ytd-watch-flexy[\s>]")
+RE_MICROFORMAT_CLOSE = re.compile(rb"</player-microformat-renderer>")
+RE_WATCH_NEXT_CLOSE = re.compile(rb"</ytd-watch-next-secondary-results-renderer>")
+
+MICROFORMAT_OPEN = b"<player-microformat-renderer"
+WATCH_NEXT_OPEN = b"<ytd-watch-next-secondary-results-renderer"
+
+
+class YtPageStreamParser:  # pylint: disable=too-many-instance-attributes
+    """Feed a watch page chunk by chunk as it downloads.
+
+    Every call to feed returns the fields that became known with that chunk,
+    they are also kept on the parser as attributes:
+
+        title, video_id and channel_id as soon as their anchor is complete,
+        up_next_videos once the watch next region has been consumed.
+
+    An emitted field is final. close returns the YtPage that parse_yt_page
+    gives for the whole page with the fields feed already emitted, which can
+    differ from it where ytInitialData, read at the end, disagrees with the
+    markup. The streamed fields are used to skip the soup when they are all
+    known.
+    """
+
+    def __init__(self) -> None:
+        self.title: str | None = None
+        self.video_id: VideoId | None = None
+        self.channel_id: ChannelId | None = None
+        self.up_next_videos: list[VideoId] | None = None
+        self._buffer = bytearray()
+        self._scanned = 0
+        self._flexy_start = -1
+        # Regions that were found but could not be parsed are not retried.
+        self._given_up: set[str] = set()
+        self._closed = False
+
+    def feed(self, chunk: bytes | str) -> dict[str, Any]:
+        """Add the next chunk of the page, returns the fields found in it."""
+        assert not self._closed, "Can not feed a closed parser."
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        self._buffer += chunk
+        found: dict[str, Any] = {}
+        start = max(0, self._scanned - OVERLAP)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self._scan_video_id(start, found)
+            self._scan_channel_id(start, found)
+            self._scan_title(start, found)
+            self._scan_up_next(start, found)
+        self._scanned = len(self._buffer)
+        return found
+
+    def close(self) -> YtPage:
+        """Finish the page and return the parsed result."""
+        self._closed = True
+        data = bytes(self._buffer)
+        try:
+            page = parse_yt_page_json(data)
+        except AssertionError:
+            if (
+                self.title is not None
+                and self.video_id is not None
+                and self.up_next_videos is not None
+            ):
+                return YtPage(
+                    video_id=self.video_id,
+                    title=self.title,
+                    channel_id=self.channel_id,
+                    up_next_videos=self.up_next_videos,
+                )
+            page = parse_yt_page_bytes(data, json_fast_path=False)
+        # A consumer may already have acted on the streamed fields.
+        return dataclasses.replace(page, **self.streamed())
+
+    def streamed(self) -> dict[str, Any]:
+        """The fields feed has emitted so far."""
+        fields = ("video_id", "title", "channel_id", "up_next_videos")
+        return {
+            field: getattr(self, field)
+            for field in fields
+            if getattr(self, field) is not None
+        }
+
+    def _scan_video_id(self, start: int, found: dict[str, Any]) -> None:
+        # The self video id is the embedUrl of the ld+json inside ytd-watch-flexy.
+        if self.video_id is not None:
+            return
+        if self._flexy_start == -1:
+            match = RE_WATCH_FLEXY_OPEN.search(self._buffer, start)
+            if match is None:
+                return
+            self._flexy_start = match.start()
+        match = RE_EMBED_URL_BYTES.search(self._buffer, max(start, self._flexy_start))
+        if match is None:
+            return
+        embed_url = match.group(1).decode("utf-8", errors="replace")
+        self.video_id = VideoId(embed_url.split("/")[-1].split("?")[0])
+        found["video_id"] = self.video_id
+
+    def _scan_channel_id(self, start: int, found: dict[str, Any]) -> None:
+        if self.channel_id is not None:
+            return
+        for match in RE_CHANNEL_ABOUT_BYTES.finditer(self._buffer, start):
+            prefix_start = match.start() - len(b'href="')
+            if prefix_start < 0:
+                continue
+            if self._buffer[prefix_start : match.start()] == b'href="':
+                channel = match.group(1).decode("utf-8", errors="replace")
+                self.channel_id = ChannelId(channel)
+                found["channel_id"] = self.channel_id
+                return
+
+    def _region(
+        self, close_re: re.Pattern[bytes], open_tag: bytes, start: int
+    ) -> tuple[int, bytes] | None:
+        match = close_re.search(self._buffer, start)
+        if match is None:
+            return None
+        region_start = self._buffer.rfind(open_tag, 0, match.start())
+        if region_start == -1:
+            return None
+        return region_start, bytes(self._buffer[region_start : match.end()])
+
+    def _in_secondary_column(self, offset: int) -> bool:
+        # div#secondary follows div#primary, older layouts put the watch next
+        # renderer below the video in the primary column instead.
+        secondary = self._buffer.rfind(b'id="secondary"', 0, offset)
+        return secondary > self._buffer.rfind(b'id="primary"', 0, offset)
+
+    def _scan_title(self, start: int, found: dict[str, Any]) -> None:
+        if self.title is not None or "title" in self._given_up:
+            return
+        region = self._region(RE_MICROFORMAT_CLOSE, MICROFORMAT_OPEN, start)
+        if region is None:
+            return
+        try:
+            self.title = parse_title(create_soup(region[1]))
+        except (AssertionError, AttributeError):
+            # parse_title falls back to the <title> tag, that is left to close.
+            self._given_up.add("title")
+            return
+        found["title"] = self.title
+
+    def _scan_up_next(self, start: int, found: dict[str, Any]) -> None:
+        if self.up_next_videos is not None or "up_next_videos" in self._given_up:
+            return
+        region = self._region(RE_WATCH_NEXT_CLOSE, WATCH_NEXT_OPEN, start)
+        if region is None:
+            return
+        region_start, markup = region
+        soup = create_soup(markup)
+        container = soup.find("ytd-watch-next-secondary-results-renderer")
+        try:
+            assert self._in_secondary_column(region_start), "Not in div#secondary."
+            assert container is not None, "Could not find watch next container."
+            video_ids = parse_out_compact_video_ids(container, verbose=False)
+        except AssertionError:
+            self._given_up.add("up_next_videos")
+            return
+        self.up_next_videos = unique_video_ids(video_ids)
+        found["up_next_videos"] = self.up_next_videos
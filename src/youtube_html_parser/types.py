@@ -1,3 +1,6 @@
+from mmap import mmap
+
+
 class VideoId(str):
     pass
 
@@ -14,3 +17,8 @@ def channel_to_url(channel_id: ChannelId) -> str:
 def video_to_url(video_id: VideoId) -> str:
     """Convert the video id to a URL."""
     return f"https://www.youtube.com/watch?v={video_id}"
+
+
+# Raw, undecoded html: bytes, a memoryview over them or an mmap of the file.
+HtmlBytes = bytes | bytearray | memoryview | mmap
+HtmlSource = str | HtmlBytes
@@ -1,26 +1,169 @@
+import gzip
+import io
+import os
 import subprocess
+import tarfile
 import tempfile
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from io import BytesIO
+import threading
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from urllib.parse import parse_qs
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
 
+from youtube_html_parser.archive import iter_tar_stream
+from youtube_html_parser.batch import (
+    ParseResult,
+    collect_metrics,
+    create_pool,
+    parse_chunk,
+    parse_many,
+)
+from youtube_html_parser.cache import ParseCache
+from youtube_html_parser.metrics import REGISTRY
 from youtube_html_parser.parser import parse_yt_page
+from youtube_html_parser.serialize import dumps_compact
+from youtube_html_parser.ytpage import YtPage
 
 HERE = Path(__file__).parent
 PROJECT_ROOT = HERE.parent.parent
 
-CLI_EXE = PROJECT_ROOT / "cli.exe"
+# Point this at cli.dist/cli.exe of a "./compile.sh standalone" build to skip
+# the onefile unpacking on every request.
+CLI_EXE = Path(os.environ.get("YOUTUBE_HTML_PARSER_CLI_EXE", PROJECT_ROOT / "cli.exe"))
 
-assert CLI_EXE.exists()
+# Results are only cached when asked for, see configure_cache. Set the
+# directory to share them between requests and restarts, or set the flag to
+# 1 for an in memory cache.
+CACHE_DIR = os.environ.get("YOUTUBE_HTML_PARSER_CACHE_DIR")
+CACHE_ENV = "YOUTUBE_HTML_PARSER_CACHE"
+
+
+def _cache_from_env() -> ParseCache | None:
+    if CACHE_DIR or os.environ.get(CACHE_ENV, "") not in ("", "0"):
+        return ParseCache(directory=CACHE_DIR)
+    return None
+
+
+CACHE = _cache_from_env()
+
+
+def configure_cache(
+    enabled: bool = True, directory: str | None = None
+) -> ParseCache | None:
+    """Replace the cache of the requests, None turns caching off."""
+    global CACHE  # pylint: disable=global-statement
+    CACHE = ParseCache(directory=directory) if enabled or directory else None
+    return CACHE
+
+
+def add_cache_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--cache", action="store_true", help="Cache parse results in memory."
+    )
+    parser.add_argument(
+        "--cache-dir", help="Cache parse results in memory and in this directory."
+    )
+
+
+def cache_from_args(args: Namespace) -> ParseCache | None:
+    """The cache the flags ask for, else the one of the environment."""
+    if args.cache or args.cache_dir:
+        return configure_cache(directory=args.cache_dir)
+    return CACHE
+
+
+# Worker processes the requests are parsed in, set up by configure_pool.
+_POOL: ProcessPoolExecutor | None = None
+_POOL_ARGS: tuple[int | None, int | None] = (None, None)
+_POOL_LOCK = threading.Lock()
+
+
+def configure_pool(
+    jobs: int | None = None, max_tasks_per_child: int | None = None
+) -> ProcessPoolExecutor:
+    """(Re)create the pool of warm workers the requests are parsed in.
+
+    Workers are replaced after max_tasks_per_child pages so a leak in a
+    worker can not grow forever.
+    """
+    global _POOL, _POOL_ARGS  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(cancel_futures=True)
+        _POOL_ARGS = (jobs, max_tasks_per_child)
+        _POOL = create_pool(jobs, max_tasks_per_child)
+        return _POOL
+
+
+def replace_broken_pool(broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+    """Recreate the pool with the configured settings after a worker died.
+
+    A pool that lost a worker (OOM kill, crash in lxml) fails every later
+    submit with BrokenProcessPool. Only the first caller replaces it, the
+    others get that replacement.
+    """
+    global _POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is None or _POOL is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            _POOL = create_pool(*_POOL_ARGS)
+        return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(cancel_futures=True)
+        _POOL = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """The configured pool, one with the defaults if there is none yet."""
+    return _POOL or configure_pool()
+
+
+def page_of(results: list[ParseResult]) -> YtPage:
+    """The page of a single item parse_chunk, raises on a failed parse."""
+    result = collect_metrics(results)[0]
+    if result.error is not None:
+        raise RuntimeError(result.error)
+    assert isinstance(result.page, YtPage)
+    return result.page
+
+
+def _parse_in_pool(html: str | bytes, profile: bool = False) -> YtPage:
+    pool = get_pool()
+    try:
+        results = pool.submit(parse_chunk, [(0, html)], False, profile).result()
+    except BrokenProcessPool:
+        pool = replace_broken_pool(pool)
+        results = pool.submit(parse_chunk, [(0, html)], False, profile).result()
+    return page_of(results)
+
+
+def invoke_parse_pool(html: str | bytes, profile: bool = False) -> str:
+    """Parse in the worker pool, results are shared through the cache if any.
+
+    Bytes are the undecoded utf-8 page and go to the workers as they are.
+    A profiled parse skips the cache.
+    """
+    if profile or CACHE is None:
+        return _parse_in_pool(html, profile=profile).serialize()
+    parsed_data = CACHE.parse(html, "page", lambda: _parse_in_pool(html))
+    return parsed_data.serialize()
 
 
 def invoke_parse_py(html: str) -> str:
-    parsed_data = parse_yt_page(html)
+    parsed_data = parse_yt_page(html, cache=CACHE)
     return parsed_data.serialize()
 
 
 def invoke_parse_cli(html: str) -> str:
+    assert CLI_EXE.exists(), f"{CLI_EXE} does not exist, see compile.sh"
     args = [str(CLI_EXE)]
     with tempfile.TemporaryDirectory() as temp_dir:
         cwd = Path(temp_dir)
@@ -29,6 +172,8 @@ def invoke_parse_cli(html: str) -> str:
         inputfile.write_text(html, encoding="utf-8")
         args.extend(["--input-html", "temp.html"])
         args.extend(["--output-json", "temp.json"])
+        if CACHE_DIR:
+            args.extend(["--cache-dir", str(Path(CACHE_DIR).resolve())])
         result = subprocess.run(args, shell=True, cwd=cwd, check=True)
         if result.returncode != 0:
             raise RuntimeError(f"Failed to run {CLI_EXE} with args: {args}")
@@ -37,43 +182,229 @@ def invoke_parse_cli(html: str) -> str:
         return out
 
 
+# Tar archives of pages POSTed here are answered with NDJSON.
+BATCH_PATH = "/batch"
+
+# GET this for the parser metrics in the Prometheus text format.
+METRICS_PATH = "/metrics"
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# A request with this header set to 1 is profiled when the workers have a
+# profile directory, see profiling.PROFILE_DIR_ENV.
+PROFILE_HEADER = "X-Profile-Parse"
+
+# Bodies with these content types are the html itself, anything else is
+# read as the legacy form with an "html" field.
+RAW_CONTENT_TYPES = ("text/html", "application/octet-stream")
+
+
+class BadRequest(Exception):
+    """The request can not be served, carries the status to reply with."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def html_from_body(body: bytes, content_type: str, encoding: str) -> str | bytes:
+    """Undo the Content-Encoding and pick the html out of a request body."""
+    encoding = encoding.strip().lower()
+    if encoding == "gzip":
+        try:
+            body = gzip.decompress(body)
+        except (OSError, EOFError) as e:
+            raise BadRequest(400, f"Bad Request: Invalid gzip body: {e}") from e
+    elif encoding != "identity":
+        raise BadRequest(415, f"Unsupported Content-Encoding: {encoding}")
+    if content_type in RAW_CONTENT_TYPES:
+        if not body:
+            raise BadRequest(400, "Bad Request: Empty body")
+        return body
+    post_data = parse_qs(body.decode("utf-8"))
+    html_content = post_data.get("html", [None])[0]
+    if not html_content:
+        raise BadRequest(400, 'Bad Request: Missing "html" field in POST data')
+    return html_content
+
+
+class _BodyReader(io.RawIOBase):
+    """Reads no more than the Content-Length of the request body."""
+
+    def __init__(self, rfile: io.BufferedIOBase, length: int) -> None:
+        super().__init__()
+        self.rfile = rfile
+        self.remaining = length
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        size = min(len(buffer), self.remaining)
+        if size == 0:
+            return 0
+        data = self.rfile.read(size)
+        buffer[: len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+    def drain(self) -> None:
+        while self.remaining and self.read(64 * 1024):
+            pass
+
+
 class SimpleHTTPRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 for the chunked batch responses, every other reply has a length.
+    protocol_version = "HTTP/1.1"
+
+    def reply(self, status: int, body: bytes, content_type: str | None = None) -> None:
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def write_chunk(self, data: bytes) -> None:
+        """One chunk of a chunked response, empty data ends the response."""
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def content_length(self) -> int:
+        """The Content-Length of the request body.
+
+        Without a valid one the body can not be skipped, so the connection is
+        closed after the reply instead of being parsed as the next request.
+        """
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self.close_connection = True
+            raise BadRequest(411, "Length Required")
+        try:
+            size = int(length)
+        except ValueError:
+            size = -1
+        if size < 0:
+            self.close_connection = True
+            raise BadRequest(400, "Bad Request: Invalid Content-Length")
+        return size
+
+    def write_error_line(self, message: str) -> None:
+        """An NDJSON line for an error that ends a batch early."""
+        error = {"ok": False, "error": message, "result": None}
+        self.write_chunk(dumps_compact(error) + b"\n")
+
+    def read_html(self) -> str | bytes:
+        """The html of the request, raw bytes unless it came form encoded."""
+        body = self.rfile.read(self.content_length())
+        return html_from_body(
+            body,
+            self.headers.get_content_type(),
+            self.headers.get("Content-Encoding", "identity"),
+        )
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if "Content-Length" in self.headers or "Transfer-Encoding" in self.headers:
+            # A GET body is never read.
+            self.close_connection = True
+        if urlsplit(self.path).path != METRICS_PATH:
+            self.reply(404, b"Not Found")
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.reply(200, body, METRICS_CONTENT_TYPE)
 
     def do_POST(self):  # pylint: disable=invalid-name
-        content_length = int(self.headers["Content-Length"])
-        body = self.rfile.read(content_length)
-        post_data = parse_qs(body.decode("utf-8"))
-
-        html_content = post_data.get("html", [None])[0]
-        response = BytesIO()
-        if html_content:
-            try:
-                # Parse the YouTube page HTML content
-                json_str = invoke_parse_cli(html_content)
-                # parsed_json = parsed_data.to_json()  # Make sure your parse_yt_page returns an object with a to_json() method or adjust accordingly
-                response.write(json_str.encode("utf-8"))
-                self.send_response(200)
-                self.send_header("Content-Type", "application/json")
-                self.end_headers()
-                self.wfile.write(response.getvalue())
-            except Exception as e:  # pylint: disable=broad-except
-                self.send_response(500)
-                self.end_headers()
-                response.write(f"Error processing the HTML: {str(e)}".encode("utf-8"))
-                self.wfile.write(response.getvalue())
-        else:
-            self.send_response(400)
-            self.end_headers()
-            response.write(b'Bad Request: Missing "html" field in POST data')
-            self.wfile.write(response.getvalue())
-
-
-def run(server_class=HTTPServer, handler_class=SimpleHTTPRequestHandler, port=8000):
+        if urlsplit(self.path).path == BATCH_PATH:
+            self.post_batch()
+            return
+        try:
+            html_content = self.read_html()
+        except BadRequest as e:
+            self.reply(e.status, str(e).encode("utf-8"))
+            return
+        try:
+            # Parse the YouTube page HTML content
+            profile = self.headers.get(PROFILE_HEADER, "").strip() == "1"
+            json_str = invoke_parse_pool(html_content, profile=profile)
+        except Exception as e:  # pylint: disable=broad-except
+            self.reply(500, f"Error processing the HTML: {str(e)}".encode("utf-8"))
+            return
+        self.reply(200, json_str.encode("utf-8"), "application/json")
+
+    def post_batch(self) -> None:
+        """Parse every html member of a (compressed) tar body.
+
+        The results are streamed back as NDJSON, one line per page in the
+        order they finish, each tagged with the member name.
+        """
+        try:
+            length = self.content_length()
+        except BadRequest as e:
+            self.reply(e.status, str(e).encode("utf-8"))
+            return
+        body = _BodyReader(self.rfile, length)
+        # tarfile detects a gzip, bz2 or xz compressed stream by itself.
+        members = iter_tar_stream(io.BufferedReader(body))
+        pool = get_pool()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for result in parse_many(
+                members, pool=pool, ordered=False, replace_pool=replace_broken_pool
+            ):
+                self.write_chunk(dumps_compact(result.to_dict()) + b"\n")
+        except (tarfile.TarError, EOFError, OSError) as e:
+            self.write_error_line(f"Bad archive: {e}")
+        except Exception as e:  # pylint: disable=broad-except
+            self.write_error_line(f"Error processing the batch: {e}")
+        body.drain()
+        self.write_chunk(b"")
+
+
+def run(  # pylint: disable=too-many-arguments
+    server_class=ThreadingHTTPServer,
+    handler_class=SimpleHTTPRequestHandler,
+    port=8000,
+    jobs: int | None = None,
+    max_tasks_per_child: int | None = None,
+):
+    # Started before the socket is bound, see create_pool.
+    configure_pool(jobs, max_tasks_per_child)
     server_address = ("127.0.0.1", port)
     httpd = server_class(server_address, handler_class)
     print(f"Starting httpd on port {port}...")
-    httpd.serve_forever()
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+        shutdown_pool()
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Parse YouTube pages POSTed over HTTP.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--jobs", type=int, help="Worker processes (default all cores)."
+    )
+    parser.add_argument(
+        "--max-tasks-per-child",
+        type=int,
+        help="Replace a worker after it parsed this many pages.",
+    )
+    parser.add_argument(
+        "--no-metrics",
+        action="store_true",
+        help=f"Do not record the parse stage timings served on {METRICS_PATH}.",
+    )
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    cache_from_args(args)
+    # Before the pool is created, its workers record when the parent does.
+    REGISTRY.enable(not args.no_metrics)
+    run(port=args.port, jobs=args.jobs, max_tasks_per_child=args.max_tasks_per_child)
 
 
 if __name__ == "__main__":
-    run()
+    main()
@@ -5,10 +5,11 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from youtube_html_parser.serialize import dumps_compact, write_json
 from youtube_html_parser.types import ChannelId, VideoId, channel_to_url, video_to_url
 
 
-@dataclass
+@dataclass(slots=True)
 class YtPage:
     """Dataclass to hold the parsed data."""
 
@@ -31,20 +32,30 @@ class YtPage:
         """Return the up next videos."""
         return [video_to_url(video_id) for video_id in self.up_next_videos if video_id]
 
-    def serialize(self) -> str:
-        """Serialize the data."""
+    def to_dict(self, urls: bool = True) -> dict[str, Any]:
+        """The serialized fields as a dict, the urls are optional."""
         out: dict[str, Any] = {
             "video_id": self.video_id,
             "title": self.title,
             "channel_id": self.channel_id,
             "up_next_video_ids": self.up_next_videos,
         }
+        if not urls:
+            return out
         # extend to include the URLs
         out["video_url"] = self.video_url()
         out["channel_url"] = self.channel_url()
         out["up_next_video_urls"] = self.up_next_videos_urls()
-        return json.dumps(out, indent=2)
+        return out
 
-    def write_json(self, outfile: Path) -> None:
+    def serialize(self, compact: bool = False, urls: bool = True) -> str:
+        """Serialize the data, compact leaves out the indentation."""
+        if compact:
+            return dumps_compact(self.to_dict(urls)).decode("utf-8")
+        return json.dumps(self.to_dict(urls), indent=2)
+
+    def write_json(
+        self, outfile: Path, compact: bool = False, urls: bool = True
+    ) -> None:
         """Write the data to a JSON file."""
-        outfile.write_text(self.serialize(), encoding="utf-8")
+        write_json(outfile, self.to_dict(urls), compact)
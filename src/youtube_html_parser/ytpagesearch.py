@@ -1,31 +1,73 @@
 # pylint: disable=import-outside-toplevel
 
 import json
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from pathlib import Path
 from typing import Any
 
-from youtube_html_parser.types import VideoId, video_to_url
+from youtube_html_parser.serialize import dumps_compact, write_json
+from youtube_html_parser.types import ChannelId, VideoId, video_to_url
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class SearchResult:  # pylint: disable=too-many-instance-attributes
+    """One result of a search page as listed in ytInitialData."""
+
+    video_id: VideoId
+    title: str | None
+    channel_id: ChannelId | None
+    channel_name: str | None
+    duration_seconds: int | None
+    view_count: int | None
+    # Relative to the time the page was fetched, e.g. "7 months ago".
+    published: str | None
+    is_short: bool = False
+    # A live stream has no view count, only the number watching.
+    is_live: bool = False
+    # Title of the shelf the result was listed in, None for the main results.
+    shelf: str | None = None
+
+
+@dataclass(slots=True)
 class YtPageSearch:
     """Dataclass to hold the parsed data."""
 
     search_results: list[VideoId]
+    # The records of search_results when parsed with rich=True.
+    results: list[SearchResult] | None = None
+
+    def __post_init__(self) -> None:
+        # Results read back from json, e.g. from the cache, are dicts.
+        if self.results is not None:
+            self.results = [
+                result if isinstance(result, SearchResult) else SearchResult(**result)
+                for result in self.results
+            ]
 
     def video_urls(self) -> list[str]:
         """Return the video URL."""
         # return f"https://www.youtube.com/watch?v={self.video_id}"
         return [video_to_url(video_id) for video_id in self.search_results]
 
-    def serialize(self) -> str:
-        """Serialize the data."""
+    def to_dict(self, urls: bool = False) -> dict[str, Any]:
+        """The serialized fields as a dict, the urls are optional."""
         out: dict[str, Any] = {
             "search_results": self.search_results,
         }
-        return json.dumps(out, indent=2)
+        if urls:
+            out["search_result_urls"] = self.video_urls()
+        if self.results is not None:
+            out["results"] = [asdict(result) for result in self.results]
+        return out
+
+    def serialize(self, compact: bool = False, urls: bool = False) -> str:
+        """Serialize the data, compact leaves out the indentation."""
+        if compact:
+            return dumps_compact(self.to_dict(urls)).decode("utf-8")
+        return json.dumps(self.to_dict(urls), indent=2)
 
-    def write_json(self, outfile: Path) -> None:
+    def write_json(
+        self, outfile: Path, compact: bool = False, urls: bool = False
+    ) -> None:
         """Write the data to a JSON file."""
-        outfile.write_text(self.serialize(), encoding="utf-8")
+        write_json(outfile, self.to_dict(urls), compact)
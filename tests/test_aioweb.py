@@ -0,0 +1,195 @@
+import asyncio
+import gc
+import os
+import socket
+import threading
+import time
+import unittest
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import requests
+
+from youtube_html_parser.aioweb import AsyncParseServer
+from youtube_html_parser.batch import create_pool
+from youtube_html_parser.parser import parse_yt_page
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+TEST_HTML = list(DATA_DIR.glob("*.html"))
+# Filter out *.pretty.html files
+TEST_HTML = [file for file in TEST_HTML if not file.name.endswith(".pretty.html")]
+
+
+def _raw_post_headers(port: int, body: bytes) -> socket.socket:
+    """Connection that sent the headers of a POST but none of its body."""
+    sock = socket.create_connection(("127.0.0.1", port), timeout=60)
+    head = (
+        "POST / HTTP/1.1\r\nHost: localhost\r\nContent-Type: text/html\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    )
+    sock.sendall(head.encode("latin-1"))
+    return sock
+
+
+def _new_pool(broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+    broken.shutdown(wait=False)
+    return create_pool(jobs=1)
+
+
+def _read_response(sock: socket.socket) -> bytes:
+    chunks: list[bytes] = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+class TestAsyncServer(unittest.TestCase):
+    """The asyncio server with one worker and room for one queued request."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.html = TEST_HTML[0].read_text(encoding="utf-8")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            cls.expected = parse_yt_page(cls.html).serialize()
+        cls.pool = create_pool(jobs=1)
+        cls.loop = asyncio.new_event_loop()
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+        cls.server = AsyncParseServer(
+            cls.pool, max_concurrent=1, max_queue=1, replace_pool=_new_pool
+        )
+        port = asyncio.run_coroutine_threadsafe(
+            cls.server.start(port=0), cls.loop
+        ).result()
+        cls.port = port
+        cls.url = f"http://127.0.0.1:{port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run_coroutine_threadsafe(cls.server.drain(), cls.loop).result()
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+        cls.loop.close()
+        cls.server.pool.shutdown()
+
+    def test_post(self):
+        response = requests.post(
+            self.url,
+            data=self.html.encode("utf-8"),
+            headers={"Content-Type": "text/html; charset=utf-8"},
+            timeout=60,
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(self.expected, response.text)
+        form = requests.post(self.url, data={"html": self.html}, timeout=60)
+        self.assertEqual(self.expected, form.text)
+        self.assertEqual(405, requests.get(self.url, timeout=60).status_code)
+
+    def test_pool_recovers_from_dead_worker(self):
+        broken = self.server.pool
+        with self.assertRaises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+        response = requests.post(
+            self.url,
+            data=self.html.encode("utf-8"),
+            headers={"Content-Type": "text/html"},
+            timeout=60,
+        )
+        self.assertEqual((200, self.expected), (response.status_code, response.text))
+        self.assertIsNot(broken, self.server.pool)
+
+    def test_header_line_too_long(self):
+        errors = []
+        self.loop.set_exception_handler(lambda _, context: errors.append(context))
+        try:
+            with socket.create_connection(("127.0.0.1", self.port), timeout=60) as sock:
+                sock.sendall(b"POST / HTTP/1.1\r\nX-Long: " + b"x" * 100_000)
+                self.assertEqual(b"", _read_response(sock))
+            gc.collect()
+            time.sleep(0.1)
+        finally:
+            self.loop.set_exception_handler(None)
+        self.assertEqual([], errors)
+
+    def test_drain_timeout(self):
+        """An idle connection does not hold up the drain past its timeout."""
+        server = AsyncParseServer(self.server.pool, max_concurrent=1)
+        port = asyncio.run_coroutine_threadsafe(
+            server.start(port=0), self.loop
+        ).result()
+        with socket.create_connection(("127.0.0.1", port), timeout=60) as idle:
+            deadline = time.monotonic() + 10
+            while not server.connections and time.monotonic() < deadline:
+                time.sleep(0.01)
+            start = time.monotonic()
+            asyncio.run_coroutine_threadsafe(server.drain(0.2), self.loop).result(10)
+            self.assertLess(time.monotonic() - start, 5)
+            self.assertEqual(b"", _read_response(idle))
+
+    def _start_full_server(self, max_queue):
+        """A server of its own whose max_queue + 1 requests wait for their body."""
+        pool = create_pool(jobs=1)
+        server = AsyncParseServer(pool, max_concurrent=1, max_queue=max_queue)
+        port = asyncio.run_coroutine_threadsafe(
+            server.start(port=0), self.loop
+        ).result()
+        body = self.html.encode("utf-8")
+        held = [_raw_post_headers(port, body) for _ in range(max_queue + 1)]
+        deadline = time.monotonic() + 10
+        while server.admitted < len(held) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return server, port, held
+
+    def _stop(self, server, held):
+        for sock in held:
+            sock.close()
+        asyncio.run_coroutine_threadsafe(server.drain(1), self.loop).result(10)
+        server.pool.shutdown()
+
+    def test_sheds_load_when_full(self):
+        body = self.html.encode("utf-8")
+        server, port, held = self._start_full_server(max_queue=1)
+        try:
+            rejected = requests.post(
+                f"http://127.0.0.1:{port}",
+                data=body,
+                headers={"Content-Type": "text/html"},
+                timeout=60,
+            )
+            self.assertEqual(503, rejected.status_code)
+            self.assertEqual("1", rejected.headers["Retry-After"])
+            for sock in held:
+                sock.sendall(body)
+            responses = [_read_response(sock) for sock in held]
+        finally:
+            self._stop(server, held)
+        for response in responses:
+            self.assertTrue(response.startswith(b"HTTP/1.1 200 OK\r\n"))
+            self.assertTrue(response.endswith(self.expected.encode("utf-8")))
+        self.assertEqual(1, server.counts["rejected"])
+
+    def test_shed_body_does_not_reset(self):
+        """The 503 reaches a client that sent its whole body before reading."""
+        body = self.html.encode("utf-8")
+        server, port, held = self._start_full_server(max_queue=0)
+        try:
+            for _ in range(5):
+                with _raw_post_headers(port, body) as sock:
+                    sock.sendall(body)
+                    time.sleep(0.2)
+                    response = _read_response(sock)
+                self.assertTrue(response.startswith(b"HTTP/1.1 503 "))
+        finally:
+            self._stop(server, held)
+
+
+if __name__ == "__main__":
+    unittest.main()
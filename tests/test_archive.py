@@ -0,0 +1,64 @@
+"""
+Unit test file.
+"""
+
+import gzip
+import tarfile
+import unittest
+import warnings
+import zipfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from youtube_html_parser.archive import iter_archive
+from youtube_html_parser.batch import parse_many
+from youtube_html_parser.parser import parse_yt_page
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+TEST_HTML = sorted(DATA_DIR.glob("*.html"))
+# Filter out *.pretty.html files
+TEST_HTML = [file for file in TEST_HTML if not file.name.endswith(".pretty.html")]
+
+
+class ArchiveTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_tar_gz(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            archive = Path(tmpdir) / "crawl.tar.gz"
+            with tarfile.open(archive, "w:gz") as tf:
+                for file in TEST_HTML:
+                    tf.add(file, arcname=f"pages/{file.name}")
+                tf.add(HERE / "test_archive.py", arcname="pages/notes.py")
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                expected = [
+                    parse_yt_page(file.read_text(encoding="utf-8"))
+                    for file in TEST_HTML
+                ]
+            results = list(parse_many(iter_archive(archive), jobs=2))
+        self.assertEqual(
+            [f"pages/{file.name}" for file in TEST_HTML],
+            [result.source for result in results],
+        )
+        self.assertEqual(expected, [result.page for result in results])
+
+    def test_zip_with_compressed_member(self) -> None:
+        html = TEST_HTML[0].read_bytes()
+        with TemporaryDirectory() as tmpdir:
+            archive = Path(tmpdir) / "crawl.zip"
+            with zipfile.ZipFile(archive, "w") as zf:
+                zf.writestr("a.html", html)
+                zf.writestr("b.html.gz", gzip.compress(html))
+            members = list(iter_archive(archive))
+            results = list(parse_many(members, jobs=1))
+        self.assertEqual(["a.html", "b.html.gz"], [member.name for member in members])
+        self.assertEqual(results[0].page, results[1].page)
+        self.assertEqual(parse_yt_page(html.decode("utf-8")), results[1].page)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Unit test file.
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import unittest
+import warnings
+from pathlib import Path
+from typing import Iterator
+
+from youtube_html_parser.batch import BatchItem, create_pool, parse_many
+from youtube_html_parser.parser import parse_yt_page, parse_yt_page_seach
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+TEST_HTML = sorted(DATA_DIR.glob("*.html")) + sorted(
+    (DATA_DIR / "error").glob("*.html")
+)
+# Filter out *.pretty.html files
+TEST_HTML = [file for file in TEST_HTML if not file.name.endswith(".pretty.html")]
+SEARCH_HTML = DATA_DIR / "search_html" / "yt_2022-09-01_7.html"
+
+
+class BatchTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_parse_many_ordered(self) -> None:
+        """Results come back in input order and match parse_yt_page."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            expected = [
+                parse_yt_page(file.read_text(encoding="utf-8")) for file in TEST_HTML
+            ]
+        results = list(parse_many(TEST_HTML, jobs=2, chunksize=2))
+        self.assertEqual(list(range(len(TEST_HTML))), [r.index for r in results])
+        self.assertEqual([str(file) for file in TEST_HTML], [r.source for r in results])
+        self.assertEqual(expected, [r.page for r in results])
+
+    def test_parse_many_as_completed_with_errors(self) -> None:
+        """A bad item is reported without aborting the batch."""
+        items = [DATA_DIR / "does-not-exist.html", TEST_HTML[0]]
+        results = list(parse_many(items, jobs=2, ordered=False))
+        self.assertEqual([0, 1], sorted(r.index for r in results))
+        by_index = {r.index: r for r in results}
+        self.assertFalse(by_index[0].ok)
+        self.assertIn("FileNotFoundError", str(by_index[0].error))
+        self.assertTrue(by_index[1].ok)
+
+    def test_parse_many_in_process(self) -> None:
+        html = SEARCH_HTML.read_text(encoding="utf-8")
+        results = list(parse_many([html, html.encode("utf-8")], jobs=1, search=True))
+        expected = parse_yt_page_seach(html)
+        self.assertEqual([expected, expected], [r.page for r in results])
+        self.assertEqual([None, None], [r.source for r in results])
+
+    def test_dead_worker_does_not_abort(self) -> None:
+        """Killed workers fail their own chunks, the batch goes on."""
+
+        def items() -> Iterator[BatchItem]:
+            for index, file in enumerate(TEST_HTML):
+                if index == 2:
+                    for child in multiprocessing.active_children():
+                        os.kill(child.pid or 0, signal.SIGKILL)
+                    time.sleep(0.5)
+                yield file
+
+        results = list(parse_many(items(), jobs=2))
+        self.assertEqual(list(range(len(TEST_HTML))), [r.index for r in results])
+        for result in results:
+            self.assertTrue(result.ok or "BrokenProcessPool" in str(result.error))
+        self.assertTrue(all(r.ok for r in results[2:]))
+
+    def test_broken_pool_of_caller(self) -> None:
+        pool = create_pool(jobs=1)
+        try:
+            pool.submit(os._exit, 1)
+            time.sleep(0.5)
+            results = list(parse_many(TEST_HTML[:2], pool=pool))
+            replaced = list(
+                parse_many(
+                    TEST_HTML[:2],
+                    pool=pool,
+                    replace_pool=lambda broken: create_pool(jobs=1),
+                )
+            )
+        finally:
+            pool.shutdown()
+        self.assertEqual(2, len(results))
+        self.assertTrue(all("BrokenProcessPool" in str(r.error) for r in results))
+        self.assertTrue(all(r.ok for r in replaced))
+
+    @unittest.skipUnless(os.path.isdir("/proc/self/fd"), "Needs /proc.")
+    def test_workers_started_without_sockets(self) -> None:
+        """All workers are up on return and hold no socket of the caller."""
+        before = set(multiprocessing.active_children())
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            sock.listen()
+            listening = f"socket:[{os.fstat(sock.fileno()).st_ino}]"
+            pool = create_pool(jobs=2)
+            try:
+                workers = set(multiprocessing.active_children()) - before
+                fds = [
+                    os.readlink(f"/proc/{worker.pid}/fd/{fd}")
+                    for worker in workers
+                    for fd in os.listdir(f"/proc/{worker.pid}/fd")
+                ]
+            finally:
+                pool.shutdown()
+        self.assertEqual(2, len(workers))
+        self.assertNotIn(listening, fds)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Unit test file.
+"""
+
+import tempfile
+import unittest
+import warnings
+from pathlib import Path
+
+from youtube_html_parser.cache import ParseCache, html_digest
+from youtube_html_parser.parser import (
+    parse_yt_page,
+    parse_yt_page_bytes,
+    parse_yt_page_seach,
+)
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+HTML = DATA_DIR / "yt-1c2402c189252cad7e3e74fe966b888f-1708156846826.html"
+SEARCH_HTML = DATA_DIR / "search_html" / "yt_2022-09-01_7.html"
+
+
+class CacheTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_memory_hit(self) -> None:
+        html = HTML.read_text(encoding="utf-8")
+        cache = ParseCache()
+        first = parse_yt_page(html, cache=cache)
+        # The bytes of the same page share the key of the str.
+        second = parse_yt_page_bytes(html.encode("utf-8"), cache=cache)
+        self.assertEqual(parse_yt_page(html), first)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        stats = cache.stats()
+        self.assertEqual((1, 1), (stats["hits"], stats["misses"]))
+
+    def test_key_depends_on_kind(self) -> None:
+        html = HTML.read_text(encoding="utf-8")
+        self.assertNotEqual(html_digest(html, "page"), html_digest(html, "search"))
+
+    def test_disk_tier(self) -> None:
+        html = SEARCH_HTML.read_text(encoding="utf-8")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            expected = parse_yt_page_seach(html, cache=ParseCache(directory=temp_dir))
+            cache = ParseCache(directory=temp_dir)
+            self.assertEqual(expected, parse_yt_page_seach(html, cache=cache))
+            self.assertEqual(1, cache.stats()["disk_hits"])
+
+    def test_lru_and_disk_eviction(self) -> None:
+        htmls = [f"<html><title>{i}</title></html>" for i in range(4)]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ParseCache(max_entries=2, directory=temp_dir, max_disk_bytes=100)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                for html in htmls:
+                    parse_yt_page_seach(html, cache=cache)
+            stats = cache.stats()
+            self.assertEqual(2, stats["entries"])
+            self.assertLessEqual(stats["disk_bytes"], 100)
+            self.assertLess(len(list(Path(temp_dir).glob("*/*.json"))), 4)
+
+    def test_overwrite_is_not_counted_twice(self) -> None:
+        page = parse_yt_page_seach(SEARCH_HTML.read_text(encoding="utf-8"))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ParseCache(directory=temp_dir)
+            for _ in range(3):
+                cache.put("k" * 40, page)
+            size = sum(path.stat().st_size for path in Path(temp_dir).glob("*/*"))
+            self.assertEqual(size, cache.stats()["disk_bytes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -46,6 +46,45 @@ class MainTester(unittest.TestCase):
             )
             self.assertEqual("UCu2uabLB7WHhkhdcLV5BcZg", data["channel_id"])
 
+    def test_batch(self) -> None:
+        """Batch mode writes one line per page in order, errors included."""
+        with TemporaryDirectory() as tmpdir:
+            manifest = Path(tmpdir) / "manifest.txt"
+            missing = Path(tmpdir) / "missing.html"
+            manifest.write_text(f"{HTML.absolute()}\n{missing}\n", encoding="utf-8")
+            outjsonl = Path(tmpdir) / "out.jsonl"
+            errors_dir = (DATA_DIR / "error").absolute()
+            cmd = (
+                f"{COMMAND} --batch {errors_dir} --manifest {manifest}"
+                f" --jobs 2 --output-jsonl {outjsonl}"
+            )
+            rtn = os.system(cmd)
+            self.assertEqual(0, rtn)
+            lines = outjsonl.read_text(encoding="utf-8").splitlines()
+            rows = [json.loads(line) for line in lines]
+            self.assertEqual(list(range(len(rows))), [row["index"] for row in rows])
+            self.assertEqual(str(HTML.absolute()), rows[-2]["source"])
+            self.assertEqual("jqiVn9nWiiQ", rows[-2]["result"]["video_id"])
+            self.assertFalse(rows[-1]["ok"])
+            self.assertIn("FileNotFoundError", rows[-1]["error"])
+
+    def test_metrics_json(self) -> None:
+        """The batch workers' metrics end up in the dump of the parent."""
+        with TemporaryDirectory() as tmpdir:
+            outjsonl = Path(tmpdir) / "out.jsonl"
+            metrics = Path(tmpdir) / "metrics.json"
+            cmd = (
+                f"{COMMAND} --batch {HTML.absolute()} --jobs 2"
+                f" --output-jsonl {outjsonl} --metrics-json {metrics}"
+            )
+            self.assertEqual(0, os.system(cmd))
+            data = json.loads(metrics.read_text(encoding="utf-8"))
+            total = data["histograms"]["stage_seconds"]["total"]
+            self.assertEqual(1, sum(total["buckets"]))
+            self.assertEqual(
+                1, sum(data["histograms"]["input_bytes"]["page"]["buckets"])
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
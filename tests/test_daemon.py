@@ -0,0 +1,94 @@
+"""
+Unit test file.
+"""
+
+import os
+import socket
+import threading
+import unittest
+import warnings
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from youtube_html_parser.daemon import DaemonClient, ParseDaemon
+from youtube_html_parser.parser import parse_yt_page, parse_yt_page_seach
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+HTML = DATA_DIR / "yt-1c2402c189252cad7e3e74fe966b888f-1708156846826.html"
+SEARCH_HTML = DATA_DIR / "search_html" / "yt_2022-09-01_7.html"
+
+COMMAND = "youtube-html-parser"
+
+
+@unittest.skipIf(not hasattr(socket, "AF_UNIX"), "Needs Unix domain sockets.")
+class DaemonTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_round_trip(self) -> None:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            expected = parse_yt_page(HTML.read_text(encoding="utf-8"))
+            expected_search = parse_yt_page_seach(
+                SEARCH_HTML.read_text(encoding="utf-8")
+            )
+        with TemporaryDirectory() as tmpdir:
+            socket_path = Path(tmpdir) / "parser.sock"
+            with ParseDaemon(socket_path, jobs=1) as server:
+                thread = threading.Thread(target=server.serve_forever, daemon=True)
+                thread.start()
+                try:
+                    with DaemonClient(socket_path, timeout=60) as client:
+                        self.assertEqual(expected.to_dict(), client.parse(path=HTML))
+                        self.assertEqual(
+                            expected.to_dict(urls=False),
+                            client.parse(data=HTML.read_bytes(), urls=False),
+                        )
+                        self.assertEqual(
+                            expected_search.to_dict(),
+                            client.parse(path=SEARCH_HTML, search=True),
+                        )
+                        with self.assertRaises(RuntimeError):
+                            client.parse(path=Path(tmpdir) / "missing.html")
+                        # A dead worker breaks the pool, the daemon replaces it.
+                        with self.assertRaises(BrokenProcessPool):
+                            server.pool.submit(os._exit, 1).result()
+                        self.assertEqual(expected.to_dict(), client.parse(path=HTML))
+                finally:
+                    server.shutdown()
+                    thread.join()
+            self.assertFalse(socket_path.exists())
+
+    def test_cli_falls_back_when_dropped(self) -> None:
+        """A daemon that hangs up mid request leaves the parse to the CLI."""
+        with TemporaryDirectory() as tmpdir:
+            socket_path = Path(tmpdir) / "parser.sock"
+            outjson = Path(tmpdir) / "out.json"
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(str(socket_path))
+            listener.listen(1)
+
+            def drop() -> None:
+                conn, _ = listener.accept()
+                conn.recv(1)
+                conn.close()
+
+            thread = threading.Thread(target=drop, daemon=True)
+            thread.start()
+            try:
+                cmd = (
+                    f"{COMMAND} --input-html {HTML.absolute()} --output-json {outjson}"
+                    f" --socket {socket_path}"
+                )
+                self.assertEqual(0, os.system(cmd))
+            finally:
+                thread.join()
+                listener.close()
+            self.assertTrue(outjson.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,11 +2,17 @@
 Unit test file.
 """
 
+import bz2
+import gzip
 import json
+import lzma
 import os
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from typing import Callable
+
+from youtube_html_parser.htmlfile import extract_html, open_html_bytes
 
 HERE = Path(__file__).parent
 DATA_DIR = HERE / "data"
@@ -16,6 +22,12 @@ HTML_GZ = DATA_DIR / "yt-1c2402c189252cad7e3e74fe966b888f-1708156846826.html.gz"
 
 COMMAND = "youtube-html-parser"
 
+COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {
+    "gz": gzip.compress,
+    "bz2": bz2.compress,
+    "xz": lzma.compress,
+}
+
 
 class MainTester(unittest.TestCase):
     """Main tester class."""
@@ -46,6 +58,19 @@ class MainTester(unittest.TestCase):
             )
             self.assertEqual("UCu2uabLB7WHhkhdcLV5BcZg", data["channel_id"])
 
+    def test_codec_from_magic_bytes(self) -> None:
+        """gzip, bz2 and xz are detected from the content, not the suffix."""
+        with gzip.open(HTML_GZ, "rb") as f:
+            html = f.read()
+        with TemporaryDirectory() as tmpdir:
+            for codec, compress in COMPRESSORS.items():
+                # The suffix is deliberately misleading.
+                infile = Path(tmpdir) / f"{codec}.html"
+                infile.write_bytes(compress(html))
+                with open_html_bytes(infile) as data:
+                    self.assertEqual(html, bytes(data))
+                self.assertEqual(html.decode("utf-8"), extract_html(infile))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+"""
+Unit test file.
+"""
+
+import unittest
+import warnings
+from pathlib import Path
+
+from youtube_html_parser.layout import StrategyDispatcher, classify_layout
+from youtube_html_parser.parser import UP_NEXT_DISPATCHER, parse_yt_page, up_next_stats
+from youtube_html_parser.scanner import HtmlScan
+from youtube_html_parser.types import VideoId
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+ERROR_DIR = DATA_DIR / "error"
+assert ERROR_DIR.exists()
+
+TEST_HTML = sorted(ERROR_DIR.glob("*.html"))
+# Filter out *.pretty.html files
+TEST_HTML = [file for file in TEST_HTML if not file.name.endswith(".pretty.html")]
+TEST_HTML += [
+    DATA_DIR / "search_html" / "yt_2022-09-01_7.html",
+    DATA_DIR / "yt-9f32e51b3fe86a17e6cc078296a6ad30-1708156950058.html",
+]
+
+
+def _fail() -> list[str]:
+    raise AssertionError("fail")
+
+
+class LayoutTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_classify_layout(self) -> None:
+        html = "<ytd-rich-grid-row></ytd-rich-grid-row>"
+        layout = classify_layout(HtmlScan(html.encode("utf-8")))
+        self.assertTrue(layout.rich_grid_row)
+        self.assertFalse(layout.watch_next)
+        self.assertEqual("rich_grid_row", layout.key())
+
+    def test_dispatcher_order(self) -> None:
+        dispatcher = StrategyDispatcher()
+        strategies = {"first": _fail, "second": lambda: ["ok"], "third": list}
+        self.assertEqual(["ok"], dispatcher.run("layout", strategies))
+        self.assertEqual(["ok"], dispatcher.run("layout", strategies))
+        self.assertEqual([], dispatcher.run("layout", strategies, skip=["second"]))
+        stats = dispatcher.stats()
+        self.assertEqual({"layout": {"second": 2, "third": 1}}, stats["taken"])
+        # A strategy that worked before does not jump the queue.
+        self.assertEqual({"layout": {"first": 3}}, stats["failed"])
+        with self.assertRaises(AssertionError):
+            dispatcher.run("other", strategies, skip=["second", "third"])
+
+    def test_parse_order_does_not_matter(self) -> None:
+        """A page parses the same whichever pages were parsed before it."""
+
+        def parse_all(files: list[Path]) -> dict[str, list[VideoId]]:
+            UP_NEXT_DISPATCHER.reset()
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                return {
+                    file.name: parse_yt_page(
+                        file.read_text(encoding="utf-8"), json_fast_path=False
+                    ).up_next_videos
+                    for file in files
+                }
+
+        forward = parse_all(TEST_HTML)
+        backward = parse_all(TEST_HTML[::-1])
+        self.assertEqual(forward, backward)
+        alone = parse_all(TEST_HTML[-2:-1])
+        self.assertEqual(alone, {TEST_HTML[-2].name: forward[TEST_HTML[-2].name]})
+        self.assertTrue(up_next_stats()["taken"])
+
+
+if __name__ == "__main__":
+    unittest.main()
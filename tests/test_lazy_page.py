@@ -0,0 +1,62 @@
+"""
+Unit test file.
+"""
+
+import unittest
+import warnings
+from pathlib import Path
+
+from youtube_html_parser.parser import parse_yt_page, parse_yt_page_lazy
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+TEST_HTML = sorted(DATA_DIR.glob("*.html")) + sorted(
+    (DATA_DIR / "error").glob("*.html")
+)
+# Filter out *.pretty.html files
+TEST_HTML = [file for file in TEST_HTML if not file.name.endswith(".pretty.html")]
+
+HTML = DATA_DIR / "yt-1c2402c189252cad7e3e74fe966b888f-1708156846826.html"
+
+
+class LazyPageTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_lazy_matches_parse_yt_page(self) -> None:
+        for test_html in TEST_HTML:
+            html = test_html.read_text(encoding="utf-8")
+            for json_fast_path in (True, False):
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    expected = parse_yt_page(html, json_fast_path=json_fast_path)
+                    page = parse_yt_page_lazy(html, json_fast_path=json_fast_path)
+                    self.assertEqual(expected, page.to_page())
+                    self.assertEqual(expected, page)
+                    self.assertEqual(page, expected)
+
+    def test_lazy_equality(self) -> None:
+        html = HTML.read_text(encoding="utf-8")
+        page = parse_yt_page_lazy(html)
+        self.assertEqual(parse_yt_page_lazy(html.encode("utf-8")), page)
+        other = parse_yt_page(html)
+        other.title = "other"
+        self.assertNotEqual(page, other)
+        self.assertNotEqual(other, page)
+        self.assertNotEqual(page, page.to_dict())
+
+    def test_channel_id_does_not_build_soup(self) -> None:
+        page = parse_yt_page_lazy(HTML.read_text(encoding="utf-8"))
+        self.assertEqual("UCu2uabLB7WHhkhdcLV5BcZg", page.channel_id)
+        self.assertNotIn("_soup", vars(page))
+        self.assertNotIn("title", vars(page))
+
+    def test_fields_are_memoised(self) -> None:
+        page = parse_yt_page_lazy(HTML.read_bytes(), json_fast_path=False)
+        self.assertIs(page.up_next_videos, page.up_next_videos)
+        self.assertEqual("jqiVn9nWiiQ", page.video_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Unit test file.
+"""
+
+import unittest
+import warnings
+from pathlib import Path
+
+from youtube_html_parser.batch import parse_many
+from youtube_html_parser.metrics import REGISTRY, MetricsRegistry
+from youtube_html_parser.parser import parse_yt_page
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+HTML = DATA_DIR / "yt-1c2402c189252cad7e3e74fe966b888f-1708156846826.html"
+
+
+def _count(data: dict, name: str, label: str) -> int:
+    return sum(data["histograms"].get(name, {}).get(label, {}).get("buckets", []))
+
+
+class MetricsTester(unittest.TestCase):
+    """Main tester class."""
+
+    def tearDown(self) -> None:
+        REGISTRY.enable(False)
+        REGISTRY.reset()
+
+    def test_registry(self) -> None:
+        registry = MetricsRegistry()
+        registry.inc("warnings_total")
+        with registry.time("soup"):
+            pass
+        self.assertEqual({"counters": {}, "histograms": {}}, registry.to_dict())
+        registry.enable()
+        registry.inc("fallbacks_total", "title_tag", 2)
+        registry.observe("stage_seconds", 0.003, "soup")
+        registry.observe("stage_seconds", 10.0, "soup")
+        other = MetricsRegistry()
+        other.merge(registry.take())
+        self.assertEqual({"counters": {}, "histograms": {}}, registry.to_dict())
+        text = other.render_prometheus()
+        self.assertIn(
+            'youtube_html_parser_fallbacks_total{fallback="title_tag"} 2', text
+        )
+        self.assertIn(
+            'youtube_html_parser_stage_seconds_bucket{stage="soup",le="0.005"} 1', text
+        )
+        self.assertIn(
+            'youtube_html_parser_stage_seconds_bucket{stage="soup",le="+Inf"} 2', text
+        )
+        self.assertIn('youtube_html_parser_stage_seconds_count{stage="soup"} 2', text)
+
+    def test_parser_stages(self) -> None:
+        html = HTML.read_text(encoding="utf-8")
+        REGISTRY.enable()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            parse_yt_page(html, json_fast_path=False)
+        data = REGISTRY.to_dict()
+        for stage in ["total", "soup", "title", "self_video_ids", "up_next", "channel"]:
+            self.assertEqual(1, _count(data, "stage_seconds", stage), stage)
+        strategies = [
+            stage
+            for stage in data["histograms"]["stage_seconds"]
+            if stage.startswith("up_next_")
+        ]
+        self.assertTrue(strategies)
+        self.assertEqual(1, _count(data, "input_bytes", "page"))
+
+    def test_disabled_records_nothing(self) -> None:
+        html = HTML.read_text(encoding="utf-8")
+        parse_yt_page(html)
+        self.assertEqual({"counters": {}, "histograms": {}}, REGISTRY.to_dict())
+
+    def test_worker_metrics_are_merged(self) -> None:
+        html = HTML.read_text(encoding="utf-8")
+        REGISTRY.enable()
+        results = list(parse_many([html, html + " "], jobs=2))
+        self.assertTrue(all(result.ok for result in results))
+        self.assertTrue(all(result.metrics is None for result in results))
+        self.assertEqual(2, _count(REGISTRY.to_dict(), "stage_seconds", "total"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Unit test file.
+"""
+
+import pickle
+import tracemalloc
+import unittest
+import warnings
+from pathlib import Path
+
+from youtube_html_parser.packed import (
+    PackedVideoIds,
+    PackedYtPage,
+    pack_page,
+    pack_video_id,
+    unpack_video_id,
+)
+from youtube_html_parser.parser import parse_yt_page, parse_yt_page_seach
+from youtube_html_parser.types import VideoId
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+TEST_HTML = sorted(DATA_DIR.glob("*.html")) + sorted(
+    (DATA_DIR / "error").glob("*.html")
+)
+# Filter out *.pretty.html files
+TEST_HTML = [file for file in TEST_HTML if not file.name.endswith(".pretty.html")]
+SEARCH_HTML = DATA_DIR / "search_html" / "yt_2022-09-01_7.html"
+
+
+class PackedTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_codec(self) -> None:
+        for video_id in ["jqiVn9nWiiQ", "AAAAAAAAAAA", "_________-w", "a-b_c0d1e2I"]:
+            value = pack_video_id(video_id)
+            assert value is not None
+            self.assertLess(value, 2**64)
+            self.assertEqual(video_id, unpack_video_id(value))
+        for video_id in ["watch?v=jqiVn9nWiiQ", "jqiVn9nWiiZ", "short"]:
+            self.assertIsNone(pack_video_id(video_id))
+
+    def test_pages_round_trip(self) -> None:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            pages = [
+                parse_yt_page(file.read_text(encoding="utf-8")) for file in TEST_HTML
+            ]
+        for page in pages:
+            packed = PackedYtPage.from_page(page)
+            self.assertEqual(page, packed.to_page())
+            self.assertEqual(page.up_next_videos, packed.up_next_videos)
+            self.assertEqual(packed, pickle.loads(pickle.dumps(packed)))
+            self.assertEqual(page.to_dict(), packed.to_dict())
+        search = parse_yt_page_seach(SEARCH_HTML.read_text(encoding="utf-8"))
+        self.assertEqual(search, pack_page(search).to_page())
+
+    def test_sequence(self) -> None:
+        ids = PackedVideoIds(["jqiVn9nWiiQ", "watch?v=SZVJtHh9Hlc", "iVVI3UWHXxY"])
+        self.assertEqual(3, len(ids))
+        self.assertIsInstance(ids[0], VideoId)
+        self.assertEqual("watch?v=SZVJtHh9Hlc", ids[1])
+        self.assertEqual("iVVI3UWHXxY", ids[-1])
+        self.assertEqual(["jqiVn9nWiiQ", "watch?v=SZVJtHh9Hlc"], ids[:2])
+        self.assertIn("iVVI3UWHXxY", ids)
+
+    def test_smaller(self) -> None:
+        page = parse_yt_page(TEST_HTML[0].read_text(encoding="utf-8"))
+        ids = list(page.up_next_videos)
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            as_list = [VideoId(video_id) for video_id in ids]
+            list_size = tracemalloc.get_traced_memory()[0] - before
+            before = tracemalloc.get_traced_memory()[0]
+            packed = PackedVideoIds(ids)
+            packed_size = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(as_list, packed)
+        self.assertLess(packed_size * 4, list_size)
+
+
+if __name__ == "__main__":
+    unittest.main()
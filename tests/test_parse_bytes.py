@@ -0,0 +1,52 @@
+"""
+Unit test file.
+"""
+
+import mmap
+import unittest
+import warnings
+from pathlib import Path
+
+from youtube_html_parser.parser import (
+    parse_yt_page,
+    parse_yt_page_bytes,
+    parse_yt_page_seach,
+    parse_yt_page_seach_bytes,
+)
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+# The json fast path applies to the first, the second falls back to the soup.
+WATCH_HTML = [
+    DATA_DIR / "yt-9f32e51b3fe86a17e6cc078296a6ad30-1708156950058.html",
+    DATA_DIR / "yt-1c2402c189252cad7e3e74fe966b888f-1708156846826.html",
+]
+SEARCH_HTML = DATA_DIR / "search_html" / "yt_2022-09-01_7.html"
+
+
+class ParseBytesTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_bytes_memoryview_mmap(self) -> None:
+        """Every bytes-like input parses the same as the decoded str."""
+        for test_html in WATCH_HTML:
+            data = test_html.read_bytes()
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                expected = parse_yt_page(data.decode("utf-8"))
+                self.assertEqual(expected, parse_yt_page_bytes(data))
+                self.assertEqual(expected, parse_yt_page_bytes(memoryview(data)))
+                with open(test_html, "rb") as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        self.assertEqual(expected, parse_yt_page_bytes(mapped))
+
+    def test_search_bytes(self) -> None:
+        data = SEARCH_HTML.read_bytes()
+        expected = parse_yt_page_seach(data.decode("utf-8"))
+        self.assertEqual(expected, parse_yt_page_seach_bytes(data))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Unit test file.
+"""
+
+import unittest
+import warnings
+from pathlib import Path
+
+from youtube_html_parser.jsonparse import (
+    WATCH_INITIAL_DATA_PATHS,
+    YT_INITIAL_DATA,
+    extract_json_paths,
+    find_json_blob,
+    find_json_paths,
+    parse_yt_page_json,
+)
+from youtube_html_parser.parser import parse_yt_page
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+# Landed directly on the watch page, so the embedded json describes it.
+WATCH_HTML = DATA_DIR / "yt-9f32e51b3fe86a17e6cc078296a6ad30-1708156950058.html"
+# Navigated to within the single page app, the embedded json is for the home page.
+NAVIGATED_HTML = DATA_DIR / "yt-1c2402c189252cad7e3e74fe966b888f-1708156846826.html"
+
+
+class ParseJsonTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_matches_soup_parser(self) -> None:
+        """The json fast path agrees with the soup parser."""
+        html = WATCH_HTML.read_text(encoding="utf-8")
+        fast = parse_yt_page_json(html)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            slow = parse_yt_page(html, json_fast_path=False)
+        self.assertEqual(slow.video_id, fast.video_id)
+        self.assertEqual(slow.title, fast.title)
+        self.assertEqual(slow.channel_id, fast.channel_id)
+        # The rendered DOM only hydrates a prefix of the related videos.
+        self.assertEqual(
+            slow.up_next_videos, fast.up_next_videos[: len(slow.up_next_videos)]
+        )
+
+    def test_stale_blob_falls_back(self) -> None:
+        """A blob for a different page is rejected."""
+        html = NAVIGATED_HTML.read_text(encoding="utf-8")
+        self.assertIsNotNone(find_json_blob(html, YT_INITIAL_DATA))
+        with self.assertRaises(AssertionError):
+            parse_yt_page_json(html)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            parsed = parse_yt_page(html)
+        self.assertEqual("jqiVn9nWiiQ", parsed.video_id)
+        self.assertEqual("UCu2uabLB7WHhkhdcLV5BcZg", parsed.channel_id)
+
+    def test_extract_paths(self) -> None:
+        """Only the wanted paths are kept, the scan stops once all are found."""
+        text = (
+            'x = { "a": {"skip": [1, {"b": 2}], "b": {"c": "d"}},\n'
+            ' "e": 1, "f": [3], "g": {"h": null}, "rest": not json'
+        )
+        start = text.index("{")
+        paths = [("a", "b", "c"), ("g", "h"), ("missing", "x"), ("f", "x")]
+        with self.assertRaises(ValueError):
+            extract_json_paths(text, start, paths)
+        found = extract_json_paths(text, start, [("a", "b", "c"), ("g", "h")])
+        self.assertEqual({"a": {"b": {"c": "d"}}, "g": {"h": None}}, found)
+
+    def test_extract_stops_without_required(self) -> None:
+        """The scan ends once a required key is known to be missing."""
+        text = '{"contents": {"browse": {"c": 1}}, "e": 1, "rest": not json'
+        paths = [("contents", "watch", "c"), ("e",)]
+        with self.assertRaises(ValueError):
+            extract_json_paths(text, 0, paths)
+        required = ("contents", "watch")
+        self.assertEqual({}, extract_json_paths(text, 0, paths, required))
+        self.assertEqual(
+            {"contents": {"watch": {"c": 1}}, "e": 1},
+            extract_json_paths(text.replace("browse", "watch"), 0, paths, required),
+        )
+        with self.assertRaises(ValueError):
+            extract_json_paths('{"contents": 1, "rest": not json', 0, paths)
+        self.assertEqual(
+            {},
+            extract_json_paths('{"contents": 1, "rest": not json', 0, paths, required),
+        )
+
+    def test_paths_match_whole_blob(self) -> None:
+        html = WATCH_HTML.read_text(encoding="utf-8")
+        whole = find_json_blob(html, YT_INITIAL_DATA)
+        sparse = find_json_paths(html, YT_INITIAL_DATA, WATCH_INITIAL_DATA_PATHS)
+        assert whole is not None and sparse is not None
+        for path in WATCH_INITIAL_DATA_PATHS:
+            value = sparse
+            expected = whole
+            for key in path:
+                value = value[key]
+                expected = expected[key]
+            self.assertEqual(expected, value)
+        self.assertNotIn("playerOverlays", sparse)
+        self.assertEqual(
+            sparse,
+            find_json_paths(
+                html.encode("utf-8"), YT_INITIAL_DATA, WATCH_INITIAL_DATA_PATHS
+            ),
+        )
+
+    def test_missing_blob(self) -> None:
+        self.assertIsNone(find_json_blob("<html></html>", YT_INITIAL_DATA))
+        with self.assertRaises(AssertionError):
+            parse_yt_page_json("<html></html>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,10 +4,12 @@
 Unit test file.
 """
 
+import json
 import time
 import unittest
 from pathlib import Path
 
+from youtube_html_parser.bench import collect_pages, compare_to_baseline, run_benchmark
 from youtube_html_parser.parser import parse_yt_page
 
 ENABLE_FETCH_UP_NEXT_VIDEOS = False
@@ -20,6 +22,8 @@ TEST_HTML = list(DATA_DIR.glob("*.html"))
 # Filter out *.pretty.html files
 TEST_HTML = [file for file in TEST_HTML if not file.name.endswith(".pretty.html")]
 
+BENCH_PAGES = collect_pages([DATA_DIR, DATA_DIR / "error"])
+BENCH_SEARCH_PAGES = collect_pages([DATA_DIR / "search_html"])
 
 PROJECT_ROOT = HERE.parent
 
@@ -44,6 +48,18 @@ class ParseTester(unittest.TestCase):
         dif = time.time() - start
         print(f"Time taken: {dif}")
 
+    def test_benchmark_report(self) -> None:
+        """The benchmark times every stage and detects regressions."""
+        report = run_benchmark(BENCH_PAGES, BENCH_SEARCH_PAGES, repeat=1, memory=False)
+        self.assertEqual(len(BENCH_PAGES) + len(BENCH_SEARCH_PAGES), report["pages"])
+        for stage in ["decode", "soup", "title", "up_next", "channel", "search"]:
+            self.assertIn(stage, report["stages"])
+        self.assertEqual([], compare_to_baseline(report, report))
+        faster = json.loads(json.dumps(report))
+        faster["stages"]["total"]["p50_ms"] /= 10
+        faster["pages_per_sec"] *= 10
+        self.assertEqual(2, len(compare_to_baseline(report, faster)))
+
 
 if __name__ == "__main__":
     unittest.main()
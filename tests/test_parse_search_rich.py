@@ -0,0 +1,165 @@
+"""
+Unit test file.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from youtube_html_parser.cache import ParseCache
+from youtube_html_parser.jsonparse import parse_search_results_json
+from youtube_html_parser.packed import pack_page
+from youtube_html_parser.parser import parse_yt_page_seach, parse_yt_page_seach_bytes
+from youtube_html_parser.types import ChannelId, VideoId
+from youtube_html_parser.ytpagesearch import SearchResult, YtPageSearch
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+SEARCH_HTML = DATA_DIR / "search_html" / "yt_2022-09-01_7.html"
+
+
+def _video(video_id: str, title: str) -> dict:
+    return {
+        "videoRenderer": {"videoId": video_id, "title": {"runs": [{"text": title}]}}
+    }
+
+
+# The layout of a results page, as opposed to the home page grid of SEARCH_HTML.
+SEARCH_DATA = {
+    "contents": {
+        "twoColumnSearchResultsRenderer": {
+            "primaryContents": {
+                "sectionListRenderer": {
+                    "contents": [
+                        {
+                            "itemSectionRenderer": {
+                                "contents": [
+                                    {
+                                        "promotedVideoRenderer": {
+                                            "videoId": "adadadadadA"
+                                        }
+                                    },
+                                    _video("aaaaaaaaaaA", "first"),
+                                    {
+                                        "reelShelfRenderer": {
+                                            "title": {"simpleText": "Shorts"},
+                                            "items": [
+                                                {
+                                                    "reelItemRenderer": {
+                                                        "videoId": "shshshshshA",
+                                                        "headline": {
+                                                            "simpleText": "short"
+                                                        },
+                                                    }
+                                                }
+                                            ],
+                                        }
+                                    },
+                                    {
+                                        "shelfRenderer": {
+                                            "title": {"simpleText": "Also watched"},
+                                            "content": {
+                                                "verticalListRenderer": {
+                                                    "items": [
+                                                        _video("bbbbbbbbbbA", "shelf"),
+                                                        _video("aaaaaaaaaaA", "again"),
+                                                    ]
+                                                }
+                                            },
+                                        }
+                                    },
+                                    {"channelRenderer": {"channelId": "UCxxxx"}},
+                                    _video("cccccccccc8", "second"),
+                                ]
+                            }
+                        },
+                        {"continuationItemRenderer": {}},
+                    ]
+                }
+            }
+        }
+    }
+}
+
+
+class SearchRichTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_home_grid(self) -> None:
+        html = SEARCH_HTML.read_text(encoding="utf-8")
+        page = parse_yt_page_seach(html, rich=True)
+        assert page.results is not None
+        self.assertEqual(21, len(page.results))
+        self.assertEqual([r.video_id for r in page.results], page.search_results)
+        self.assertEqual(
+            SearchResult(
+                video_id=VideoId("d-32DuThxOg"),
+                title="25 Best and Funniest Moments of Fans in Sports",
+                channel_id=ChannelId("UCSNpKEljp_Yqlo-1lUpnJNg"),
+                channel_name="Novella",
+                duration_seconds=677,
+                view_count=18163353,
+                published="7 months ago",
+            ),
+            page.results[0],
+        )
+        live = page.results[1]
+        self.assertEqual(
+            ("jfKfPfyJRdk", True, None), (live.video_id, live.is_live, live.view_count)
+        )
+        # Every rich result is also one of the watch links.
+        links = parse_yt_page_seach(html).search_results
+        self.assertTrue(set(page.search_results) <= set(links))
+        self.assertEqual(
+            page, parse_yt_page_seach_bytes(html.encode("utf-8"), rich=True)
+        )
+
+    def test_search_layout(self) -> None:
+        results = parse_search_results_json(SEARCH_DATA)
+        self.assertEqual(
+            [("aaaaaaaaaaA", "first"), ("cccccccccc8", "second")],
+            [(r.video_id, r.title) for r in results],
+        )
+        with_shelves = parse_search_results_json(SEARCH_DATA, shelves=True)
+        self.assertEqual(
+            [
+                ("aaaaaaaaaaA", None, False),
+                ("shshshshshA", "Shorts", True),
+                ("bbbbbbbbbbA", "Also watched", False),
+                ("cccccccccc8", None, False),
+            ],
+            [(r.video_id, r.shelf, r.is_short) for r in with_shelves],
+        )
+        html = f"<script>var ytInitialData = {json.dumps(SEARCH_DATA)};</script>"
+        page = parse_yt_page_seach(html, rich=True)
+        self.assertEqual(["aaaaaaaaaaA", "cccccccccc8"], page.search_results)
+
+    def test_fallback_to_links(self) -> None:
+        page = parse_yt_page_seach('<a href="/watch?v=jqiVn9nWiiQ">', rich=True)
+        self.assertEqual(YtPageSearch(search_results=[VideoId("jqiVn9nWiiQ")]), page)
+
+    def test_cache_and_pack(self) -> None:
+        html = SEARCH_HTML.read_text(encoding="utf-8")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            expected = parse_yt_page_seach(
+                html, cache=ParseCache(directory=temp_dir), rich=True
+            )
+            cache = ParseCache(directory=temp_dir)
+            self.assertEqual(
+                expected, parse_yt_page_seach(html, cache=cache, rich=True)
+            )
+            self.assertEqual(1, cache.stats()["disk_hits"])
+            # Plain and rich results are cached apart.
+            self.assertIsNone(parse_yt_page_seach(html, cache=cache).results)
+        self.assertEqual(expected, pack_page(expected).to_page())
+        self.assertEqual(
+            expected.to_dict()["results"][0]["title"],
+            "25 Best and Funniest Moments of Fans in Sports",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Unit test file.
+"""
+
+import json
+import os
+import pstats
+import tempfile
+import tracemalloc
+import unittest
+import warnings
+from pathlib import Path
+
+from youtube_html_parser.batch import parse_chunk
+from youtube_html_parser.metrics import REGISTRY
+from youtube_html_parser.parser import (
+    UP_NEXT_DISPATCHER,
+    parse_yt_page,
+    parse_yt_page_seach,
+)
+from youtube_html_parser.profiling import PROFILER, profile_config
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+HTML = DATA_DIR / "yt-1c2402c189252cad7e3e74fe966b888f-1708156846826.html"
+SEARCH_HTML = DATA_DIR / "search_html" / "yt_2022-09-01_7.html"
+
+COMMAND = "youtube-html-parser"
+
+
+class ProfilingTester(unittest.TestCase):
+    """Main tester class."""
+
+    def setUp(self) -> None:
+        # pylint: disable-next=consider-using-with
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmpdir.name)
+
+    def tearDown(self) -> None:
+        PROFILER.configure(None)
+        self.tmpdir.cleanup()
+
+    def captures(self) -> list[Path]:
+        return sorted(self.directory.iterdir())
+
+    def test_every_nth_parse(self) -> None:
+        html = SEARCH_HTML.read_text(encoding="utf-8")
+        PROFILER.configure(profile_config(self.directory, every=2, memory=True))
+        for _ in range(3):
+            parse_yt_page_seach(html)
+        captures = self.captures()
+        self.assertEqual(1, len(captures))
+        capture = captures[0]
+        self.assertEqual(html, (capture / "input.html").read_text(encoding="utf-8"))
+        meta = json.loads((capture / "meta.json").read_text(encoding="utf-8"))
+        self.assertEqual(("search", "sampled"), (meta["kind"], meta["reason"]))
+        stats = pstats.Stats(str(capture / "profile.pstats"))
+        functions = [name for _, _, name in stats.stats]  # type: ignore[attr-defined]
+        self.assertIn("parse_all_watchable_links", functions)
+        self.assertTrue((capture / "profile.txt").exists())
+        self.assertTrue((capture / "tracemalloc.txt").exists())
+
+    def test_latency_threshold(self) -> None:
+        html = HTML.read_text(encoding="utf-8")
+        PROFILER.configure(profile_config(self.directory, threshold_ms=1e9))
+        expected = parse_yt_page(html)
+        self.assertEqual([], self.captures())
+        PROFILER.configure(profile_config(self.directory, threshold_ms=0))
+        self.assertEqual(expected, parse_yt_page(html))
+        captures = self.captures()
+        self.assertEqual(1, len(captures))
+        meta = json.loads((captures[0] / "meta.json").read_text(encoding="utf-8"))
+        self.assertEqual(("page", "slow"), (meta["kind"], meta["reason"]))
+        self.assertFalse((captures[0] / "tracemalloc.txt").exists())
+
+    def test_slow_rerun_is_not_recorded(self) -> None:
+        html = HTML.read_text(encoding="utf-8")
+        PROFILER.configure(profile_config(self.directory, threshold_ms=0))
+        UP_NEXT_DISPATCHER.reset()
+        REGISTRY.enable()
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                parse_yt_page(html, json_fast_path=False)
+            stages = REGISTRY.to_dict()["histograms"]["stage_seconds"]
+        finally:
+            REGISTRY.enable(False)
+            REGISTRY.reset()
+        self.assertEqual(1, len(self.captures()))
+        for stage in ["total", "soup", "title", "up_next"]:
+            self.assertEqual(1, sum(stages[stage]["buckets"]), stage)
+        taken = UP_NEXT_DISPATCHER.stats()["taken"]
+        self.assertEqual(1, sum(sum(names.values()) for names in taken.values()))
+
+    def test_keeps_outside_tracemalloc(self) -> None:
+        html = SEARCH_HTML.read_text(encoding="utf-8")
+        PROFILER.configure(profile_config(self.directory, memory=True))
+        tracemalloc.start()
+        try:
+            parse_yt_page_seach(html)
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+        self.assertTrue((self.captures()[0] / "tracemalloc.txt").exists())
+
+    def test_forced_and_disabled(self) -> None:
+        html = HTML.read_text(encoding="utf-8")
+        parse_chunk([(0, html)], profile=True)
+        self.assertEqual([], self.captures())
+        PROFILER.configure(profile_config(self.directory, threshold_ms=1e9))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            results = parse_chunk([(0, html), (1, "<html></html>")], profile=True)
+        self.assertEqual([True, False], [result.ok for result in results])
+        metas = [
+            json.loads((capture / "meta.json").read_text(encoding="utf-8"))
+            for capture in self.captures()
+        ]
+        self.assertEqual(["forced", "forced"], [meta["reason"] for meta in metas])
+        self.assertEqual(1, sum(meta["error"] is not None for meta in metas))
+
+    def test_cli(self) -> None:
+        outjson = self.directory / "out.json"
+        profile_dir = self.directory / "profiles"
+        cmd = (
+            f"{COMMAND} --input-html {HTML.absolute()} --output-json {outjson}"
+            f" --profile-dir {profile_dir}"
+        )
+        self.assertEqual(0, os.system(cmd))
+        self.assertEqual(1, len(list(profile_dir.glob("*/profile.pstats"))))
+
+
+if __name__ == "__main__":
+    unittest.main()
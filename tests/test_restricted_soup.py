@@ -0,0 +1,42 @@
+"""
+Unit test file.
+"""
+
+import unittest
+import warnings
+from pathlib import Path
+
+from youtube_html_parser.parser import create_soup, parse_title, parse_yt_page
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+TEST_HTML = list(DATA_DIR.glob("*.html")) + list((DATA_DIR / "error").glob("*.html"))
+# Filter out *.pretty.html files
+TEST_HTML = [file for file in TEST_HTML if not file.name.endswith(".pretty.html")]
+
+
+class RestrictedSoupTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_matches_full_soup(self) -> None:
+        """The restricted soup gives the same results as the full soup."""
+        for test_html in TEST_HTML:
+            html = test_html.read_text(encoding="utf-8")
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                full = parse_yt_page(html, json_fast_path=False, restricted_soup=False)
+                restricted = parse_yt_page(
+                    html, json_fast_path=False, restricted_soup=True
+                )
+            self.assertEqual(full, restricted, test_html.name)
+
+    def test_title_tag_is_kept(self) -> None:
+        html = "<html><head><title>Hello - YouTube</title></head><body></body></html>"
+        soup = create_soup(html, restricted=True)
+        self.assertEqual("Hello", parse_title(soup))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Unit test file.
+"""
+
+import re
+import unittest
+from pathlib import Path
+
+from youtube_html_parser.scanner import HtmlScan
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+TEST_HTML = list(DATA_DIR.rglob("*.html"))
+# Filter out *.pretty.html files
+TEST_HTML = [file for file in TEST_HTML if not file.name.endswith(".pretty.html")]
+
+
+def _search(pattern: str, html: str) -> str | None:
+    match = re.search(pattern, html)
+    return match.group(1) if match else None
+
+
+def _unique(items: list[str]) -> list[str]:
+    return list(dict.fromkeys(items))
+
+
+class ScannerTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_matches_separate_regexes(self) -> None:
+        """The shared scan finds what the separate regex sweeps found."""
+        for test_html in TEST_HTML:
+            html = test_html.read_text(encoding="utf-8")
+            scan = HtmlScan(html)
+            self.assertEqual(
+                _search(r'href="/channel/([^/]+)/about"', html), scan.channel_id
+            )
+            self.assertEqual(
+                _search(r'/channel/([^/">\b]+)/about"', html), scan.channel_id_loose
+            )
+            self.assertEqual(
+                _unique(re.findall(r"watch\?v=([\w-]+)", html)), scan.watch_ids
+            )
+            for name in ("ytInitialData", "ytInitialPlayerResponse"):
+                idx = html.find(f"var {name} = ")
+                expected = idx + len(f"var {name} = ") if idx != -1 else None
+                self.assertEqual(expected, scan.json_blob_offsets.get(name))
+
+    def test_window_assignment(self) -> None:
+        html = '<script>window["ytInitialData"] = {"a": 1};</script>'
+        scan = HtmlScan(html)
+        self.assertEqual(html.index("{"), scan.json_blob_offsets["ytInitialData"])
+        self.assertEqual({}, HtmlScan("ytInitialData = {}").json_blob_offsets)
+
+
+if __name__ == "__main__":
+    unittest.main()
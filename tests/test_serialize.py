@@ -0,0 +1,59 @@
+"""
+Unit test file.
+"""
+
+import json
+import unittest
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from youtube_html_parser import serialize
+from youtube_html_parser.parser import parse_yt_page
+from youtube_html_parser.serialize import NdjsonWriter, dumps_compact
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+HTML = DATA_DIR / "yt-1c2402c189252cad7e3e74fe966b888f-1708156846826.html"
+
+
+class SerializeTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_compact_without_urls(self) -> None:
+        page = parse_yt_page(HTML.read_text(encoding="utf-8"))
+        compact = page.serialize(compact=True, urls=False)
+        self.assertNotIn("\n", compact)
+        self.assertNotIn("up_next_video_urls", compact)
+        self.assertEqual(page.to_dict(urls=False), json.loads(compact))
+        self.assertLess(len(compact), len(page.serialize()) / 2)
+        with TemporaryDirectory() as tmpdir:
+            outfile = Path(tmpdir) / "out.json"
+            page.write_json(outfile)
+            self.assertEqual(page.serialize(), outfile.read_text(encoding="utf-8"))
+
+    def test_ndjson_writer(self) -> None:
+        page = parse_yt_page(HTML.read_text(encoding="utf-8"))
+        out = BytesIO()
+        writer = NdjsonWriter(out)
+        writer.write(page)
+        writer.write(page)
+        lines = out.getvalue().decode("utf-8").splitlines()
+        self.assertEqual(2, writer.count)
+        self.assertEqual([page.to_dict(urls=False)] * 2, [json.loads(x) for x in lines])
+
+    def test_fallback_encoder_matches(self) -> None:
+        obj = {"title": "café ☃", "ids": ["a", "b"], "none": None}
+        fast = dumps_compact(obj)
+        orjson = serialize.orjson
+        serialize.orjson = None  # type: ignore[assignment]
+        try:
+            self.assertEqual(fast, dumps_compact(obj))
+        finally:
+            serialize.orjson = orjson
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Unit test file.
+"""
+
+import subprocess
+import sys
+import time
+import unittest
+from pathlib import Path
+
+HERE = Path(__file__).parent
+# Parsed through the ytInitialData fast path.
+JSON_HTML = HERE / "data" / "yt-9f32e51b3fe86a17e6cc078296a6ad30-1708156950058.html"
+
+# Generous so a loaded CI machine does not fail, the printed time is what matters.
+MAX_STARTUP_SECONDS = 2.0
+
+
+def _run(code: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+class StartupTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_cli_import_is_light(self) -> None:
+        """Importing the CLI does not pull in bs4 or lxml."""
+        code = (
+            "import sys, youtube_html_parser.cli;"
+            "print(sorted(m for m in ('bs4', 'lxml') if m in sys.modules))"
+        )
+        self.assertEqual("[]", _run(code))
+
+    def test_fast_path_skips_bs4(self) -> None:
+        """A page parsed from its json never imports bs4 or lxml."""
+        code = (
+            "import sys;"
+            "from youtube_html_parser.parser import parse_yt_page_bytes;"
+            f"page = parse_yt_page_bytes(open({str(JSON_HTML)!r}, 'rb').read());"
+            "assert page.up_next_videos;"
+            "print(sorted(m for m in ('bs4', 'lxml') if m in sys.modules))"
+        )
+        self.assertEqual("[]", _run(code))
+
+    def test_startup_time(self) -> None:
+        baseline_start = time.perf_counter()
+        _run("pass")
+        baseline = time.perf_counter() - baseline_start
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "youtube_html_parser.cli", "--help"],
+            capture_output=True,
+            check=True,
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"CLI startup: {elapsed * 1000:.0f} ms, bare python {baseline * 1000:.0f} ms"
+        )
+        self.assertLess(elapsed, MAX_STARTUP_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
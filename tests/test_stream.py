@@ -0,0 +1,86 @@
+"""
+Unit test file.
+"""
+
+import unittest
+import warnings
+from pathlib import Path
+
+from youtube_html_parser.parser import parse_yt_page_bytes
+from youtube_html_parser.stream import YtPageStreamParser
+
+HERE = Path(__file__).parent
+DATA_DIR = HERE / "data"
+assert DATA_DIR.exists()
+
+TEST_HTML = list(DATA_DIR.glob("*.html")) + list((DATA_DIR / "error").glob("*.html"))
+# Filter out *.pretty.html files
+TEST_HTML = [file for file in TEST_HTML if not file.name.endswith(".pretty.html")]
+SEARCH_HTML = DATA_DIR / "search_html" / "yt_2022-09-01_7.html"
+JSON_HTML = DATA_DIR / "yt-9f32e51b3fe86a17e6cc078296a6ad30-1708156950058.html"
+
+HTML = DATA_DIR / "yt-1c2402c189252cad7e3e74fe966b888f-1708156846826.html"
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _chunks(data: bytes, size: int = CHUNK_SIZE) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class StreamParserTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_close_matches_parse_yt_page(self) -> None:
+        """close is parse_yt_page, except for fields feed already emitted."""
+        for test_html in TEST_HTML + [SEARCH_HTML]:
+            data = test_html.read_bytes()
+            parser = YtPageStreamParser()
+            streamed: dict[str, object] = {}
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                for chunk in _chunks(data):
+                    for field, value in parser.feed(chunk).items():
+                        self.assertNotIn(field, streamed)
+                        streamed[field] = value
+                page = parser.close()
+                expected = parse_yt_page_bytes(data)
+            self.assertEqual(streamed, parser.streamed())
+            for field, value in streamed.items():
+                self.assertEqual(value, getattr(page, field), (test_html, field))
+            if test_html != JSON_HTML:
+                self.assertEqual(expected, page, test_html)
+                continue
+            # The markup of this page disagrees with ytInitialData on up next.
+            self.assertEqual(20, len(expected.up_next_videos))
+            self.assertEqual(14, len(page.up_next_videos))
+            self.assertEqual(expected.title, page.title)
+
+    def test_fields_arrive_before_the_end(self) -> None:
+        """Every field is emitted while there is still page left to download."""
+        chunks = _chunks(HTML.read_bytes())
+        parser = YtPageStreamParser()
+        seen: dict[str, int] = {}
+        for i, chunk in enumerate(chunks):
+            for field in parser.feed(chunk):
+                seen[field] = i
+        self.assertEqual(
+            {"title", "video_id", "channel_id", "up_next_videos"}, set(seen)
+        )
+        self.assertLess(max(seen.values()), len(chunks) - 1)
+        self.assertEqual("jqiVn9nWiiQ", parser.video_id)
+        self.assertEqual("UCu2uabLB7WHhkhdcLV5BcZg", parser.channel_id)
+        self.assertEqual(20, len(parser.up_next_videos or []))
+
+    def test_anchor_split_across_chunks(self) -> None:
+        """An anchor cut in two by a chunk boundary is still found."""
+        data = HTML.read_bytes()
+        split = data.index(b'href="/channel/UCu2uabLB7WHhkhdcLV5BcZg/about"') + 20
+        parser = YtPageStreamParser()
+        self.assertNotIn("channel_id", parser.feed(data[:split]))
+        self.assertIn("channel_id", parser.feed(data[split : split + 100]))
+        self.assertEqual("UCu2uabLB7WHhkhdcLV5BcZg", parser.channel_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,26 @@
 import concurrent.futures
+import gzip
+import io
+import json
+import os
+import socket
 import subprocess
 import sys
+import tarfile
+import threading
 import time
 import unittest
+import warnings
+from argparse import ArgumentParser
+from concurrent.futures.process import BrokenProcessPool
+from http.server import ThreadingHTTPServer
 from pathlib import Path
 
 import requests
 
+from youtube_html_parser import web
+from youtube_html_parser.parser import parse_yt_page
+
 ENABLED = False
 
 PYTHON_EXE = sys.executable
@@ -95,5 +109,186 @@ class TestSimpleHTTPServer(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
 
 
+class TestCacheConfig(unittest.TestCase):
+    def test_cache_is_opt_in(self):
+        env = {
+            name: value
+            for name, value in os.environ.items()
+            if not name.startswith(web.CACHE_ENV)
+        }
+        out = subprocess.run(
+            [PYTHON_EXE, "-c", "from youtube_html_parser import web; print(web.CACHE)"],
+            env=env,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        self.assertEqual("None", out.strip())
+        parser = ArgumentParser()
+        web.add_cache_arguments(parser)
+        web.configure_cache(False)
+        try:
+            self.assertIsNone(web.cache_from_args(parser.parse_args([])))
+            cache = web.cache_from_args(parser.parse_args(["--cache"]))
+            self.assertIsNotNone(cache)
+            self.assertIs(cache, web.CACHE)
+        finally:
+            web.configure_cache(False)
+        html = TEST_HTML[0].read_text(encoding="utf-8")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.assertEqual(parse_yt_page(html).serialize(), web.invoke_parse_py(html))
+
+
+class TestPoolServer(unittest.TestCase):
+    """The threaded server parsing in the worker pool, run in this process."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.html = TEST_HTML[0].read_text(encoding="utf-8")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            cls.expected = parse_yt_page(cls.html).serialize()
+        web.configure_cache()
+        web.configure_pool(jobs=2, max_tasks_per_child=1)
+        cls.httpd = ThreadingHTTPServer(("127.0.0.1", 0), web.SimpleHTTPRequestHandler)
+        cls.thread = threading.Thread(target=cls.httpd.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.httpd.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+        web.shutdown_pool()
+        web.configure_cache(False)
+
+    def test_concurrent_posts(self):
+        html = self.html
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(requests.post, self.url, data={"html": h}, timeout=60)
+                for h in [html, html + " ", html + "  ", html]
+            ]
+            responses = [future.result() for future in futures]
+        bad = requests.post(self.url, data={"other": "x"}, timeout=60)
+        self.assertEqual([200] * 4, [response.status_code for response in responses])
+        self.assertEqual([self.expected] * 4, [response.text for response in responses])
+        self.assertEqual(400, bad.status_code)
+
+    def test_pool_recovers_from_dead_worker(self):
+        broken = web.get_pool()
+        with self.assertRaises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+        response = requests.post(
+            self.url, data={"html": self.html + "\n\n\n"}, timeout=60
+        )
+        self.assertEqual((200, self.expected), (response.status_code, response.text))
+        self.assertIsNot(broken, web.get_pool())
+
+    def test_metrics(self):
+        web.REGISTRY.enable()
+        try:
+            web.REGISTRY.inc("fallbacks_total", "json_to_soup")
+            response = requests.get(self.url + web.METRICS_PATH, timeout=60)
+            missing = requests.get(self.url + "/other", timeout=60)
+        finally:
+            web.REGISTRY.enable(False)
+            web.REGISTRY.reset()
+        self.assertEqual(200, response.status_code)
+        self.assertIn(
+            'youtube_html_parser_fallbacks_total{fallback="json_to_soup"} 1',
+            response.text,
+        )
+        self.assertEqual(404, missing.status_code)
+
+    def test_raw_and_gzip_bodies(self):
+        body = (self.html + "\n").encode("utf-8")
+        raw = requests.post(
+            self.url,
+            data=body,
+            headers={"Content-Type": "text/html; charset=utf-8"},
+            timeout=60,
+        )
+        compressed = requests.post(
+            self.url,
+            data=gzip.compress(body),
+            headers={"Content-Type": "text/html", "Content-Encoding": "gzip"},
+            timeout=60,
+        )
+        unsupported = requests.post(
+            self.url,
+            data=body,
+            headers={"Content-Type": "text/html", "Content-Encoding": "br"},
+            timeout=60,
+        )
+        self.assertEqual((200, self.expected), (raw.status_code, raw.text))
+        self.assertEqual(
+            (200, self.expected), (compressed.status_code, compressed.text)
+        )
+        self.assertEqual(415, unsupported.status_code)
+
+    def test_batch_tar_stream(self):
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode="w:gz") as tf:
+            for file in TEST_HTML:
+                tf.add(file, arcname=file.name)
+        with requests.post(
+            f"{self.url}/batch",
+            data=archive.getvalue(),
+            headers={"Content-Type": "application/x-tar"},
+            stream=True,
+            timeout=60,
+        ) as response:
+            self.assertEqual(200, response.status_code)
+            self.assertEqual("chunked", response.headers["Transfer-Encoding"])
+            rows = [json.loads(line) for line in response.iter_lines() if line]
+        self.assertEqual(
+            sorted(file.name for file in TEST_HTML),
+            sorted(row["source"] for row in rows),
+        )
+        self.assertTrue(all(row["ok"] for row in rows))
+        first = next(row for row in rows if row["source"] == TEST_HTML[0].name)
+        self.assertEqual(json.loads(self.expected), first["result"])
+        # The connection stays usable after a streamed reply.
+        bad = requests.post(f"{self.url}/batch", data=b"not a tar", timeout=60)
+        self.assertFalse(json.loads(bad.text.splitlines()[0])["ok"])
+
+    def test_unread_body_closes_connection(self):
+        """A chunked body without a length is not parsed as the next request."""
+        hidden = b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n"
+        chunked = f"{len(hidden):X}\r\n".encode("ascii") + hidden + b"\r\n0\r\n\r\n"
+        for path in ["/", "/batch"]:
+            head = (
+                f"POST {path} HTTP/1.1\r\nHost: localhost\r\n"
+                "Transfer-Encoding: chunked\r\n\r\n"
+            )
+            port = self.httpd.server_address[1]
+            with socket.create_connection(("127.0.0.1", port), timeout=60) as sock:
+                sock.sendall(head.encode("latin-1") + chunked)
+                chunks = []
+                while chunk := sock.recv(65536):
+                    chunks.append(chunk)
+            response = b"".join(chunks)
+            self.assertTrue(response.startswith(b"HTTP/1.1 411 "), response)
+            self.assertIn(b"Connection: close", response)
+            self.assertEqual(1, response.count(b"HTTP/1.1 "), response)
+
+    def test_batch_on_broken_pool(self):
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode="w") as tf:
+            tf.add(TEST_HTML[0], arcname=TEST_HTML[0].name)
+        broken = web.get_pool()
+        with self.assertRaises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+        # The batch goes on in a replacement pool.
+        response = requests.post(
+            f"{self.url}/batch", data=archive.getvalue(), timeout=60
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(json.loads(response.text)["ok"])
+        self.assertIsNot(broken, web.get_pool())
+
+
 if __name__ == "__main__":
     unittest.main()